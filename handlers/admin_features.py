@@ -25,6 +25,14 @@ class AdminFeatures:
         except Exception as e:
             print(f"Erreur lors de la sauvegarde des utilisateurs : {e}")
 
+    def get_groups(self) -> dict:
+        """
+        Groupes d'accès {nom_du_groupe: [ids des membres]}.
+        Les produits nommés "<groupe>_..." ne sont visibles que des membres.
+        Aucun groupe n'est encore géré ici : tous les produits sont visibles.
+        """
+        return {}
+
     async def register_user(self, user):
         """Enregistre ou met à jour un utilisateur"""
         user_id = str(user.id)
@@ -1,19 +1,31 @@
 from handlers.admin_features import AdminFeatures
 from modules.access_manager import AccessManager
+from modules.file_utils import write_file_atomic
 import json
+try:
+    # orjson (facultatif) accélère la lecture de la config et du catalogue
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 import logging
+import logging.handlers
 import asyncio
+import atexit
 import shutil
+import time
 import hashlib
+import heapq
 import os
+import queue
 import re
-import random
-from datetime import datetime, time
-import pytz
+from collections import OrderedDict
+from datetime import datetime, timezone
+from operator import itemgetter
+from zoneinfo import ZoneInfo
 import base64
 from urllib.parse import quote, unquote
-from telegram.error import NetworkError, TimedOut, RetryAfter
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest, NetworkError, TimedOut, RetryAfter
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto, InputMediaVideo
 from telegram.ext import (
     Application, 
     CommandHandler, 
@@ -23,32 +35,39 @@ from telegram.ext import (
     ContextTypes, 
     ConversationHandler
 )
-paris_tz = pytz.timezone('Europe/Paris')
+paris_tz = ZoneInfo('Europe/Paris')
 
-STATS_CACHE = None
-LAST_CACHE_UPDATE = None
 admin_features = None
 
 # Désactiver les logs de httpx
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
-# Configuration du logging
+# Configuration du logging : les handlers ne font que déposer les enregistrements dans
+# une file, l'écriture fichier/console se fait dans le thread du QueueListener
+_LOG_QUEUE = queue.SimpleQueue()
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_log_handlers = [logging.FileHandler('bot.log'), logging.StreamHandler()]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
 logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO,
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
+    handlers=[logging.handlers.QueueHandler(_LOG_QUEUE)]
 )
+LOG_LISTENER = logging.handlers.QueueListener(_LOG_QUEUE, *_log_handlers)
+LOG_LISTENER.start()
+# Vider la file de logs à la sortie du processus
+atexit.register(LOG_LISTENER.stop)
 logger = logging.getLogger(__name__)
 
+CONFIG_FILE = 'config/config.json'
+
 # Charger la configuration
 try:
-    with open('config/config.json', 'r', encoding='utf-8') as f:
-        CONFIG = json.load(f)
+    with open(CONFIG_FILE, 'rb') as f:
+        CONFIG = json_loads(f.read())
         TOKEN = CONFIG['token']
-        ADMIN_IDS = CONFIG['admin_ids']
+        # Ensemble d'entiers pour un test d'appartenance direct sur user.id
+        ADMIN_IDS = frozenset(int(admin_id) for admin_id in CONFIG['admin_ids'])
 except FileNotFoundError:
     print("Erreur: Le fichier config.json n'a pas été trouvé!")
     exit(1)
@@ -56,112 +75,443 @@ except KeyError as e:
     print(f"Erreur: La clé {e} est manquante dans le fichier config.json!")
     exit(1)
 
+# Version de CONFIG, incrémentée à chaque sauvegarde pour invalider les claviers en cache
+_CONFIG_VERSION = 0
+_MENU_CACHE = {}
+
+# Index id -> bouton personnalisé, partage les dicts de CONFIG['custom_buttons']
+_BUTTON_INDEX = {}
+
+def rebuild_button_index():
+    """Reconstruit l'index des boutons personnalisés à partir de CONFIG"""
+    _BUTTON_INDEX.clear()
+    _BUTTON_INDEX.update((b['id'], b) for b in CONFIG.get('custom_buttons', []))
+
+def save_config(config=None):
+    """Met à jour CONFIG en mémoire et l'écrit sur disque de façon atomique"""
+    global _CONFIG_VERSION
+    if config is not None and config is not CONFIG:
+        CONFIG.update(config)
+        rebuild_button_index()
+    _CONFIG_VERSION += 1
+    _MENU_CACHE.clear()
+    # Sérialiser en mémoire puis écrire en un seul appel
+    write_file_atomic(CONFIG_FILE, json.dumps(CONFIG, indent=4).encode())
+
+# Écriture différée de la configuration, sur le modèle du catalogue : CONFIG est
+# modifié en place et une tâche de fond regroupe les sauvegardes
+CONFIG_FLUSH_DELAY = 1.0
+_CONFIG_DIRTY = asyncio.Event()
+# Empêche deux écritures simultanées de config.json depuis des threads différents
+_CONFIG_LOCK = asyncio.Lock()
+_config_flush_task = None
+
+async def save_config_async(config=None):
+    """Sauvegarde CONFIG dans un thread, une seule écriture de config.json à la fois"""
+    async with _CONFIG_LOCK:
+        await asyncio.to_thread(save_config, config)
+
+def mark_config_dirty():
+    """Signale que CONFIG a été modifié : les caches sont invalidés tout de suite, l'écriture est différée"""
+    global _CONFIG_VERSION
+    _CONFIG_VERSION += 1
+    _MENU_CACHE.clear()
+    _CONFIG_DIRTY.set()
+
+async def _config_flusher():
+    """Tâche de fond qui regroupe les modifications de CONFIG en une seule écriture"""
+    while True:
+        await _CONFIG_DIRTY.wait()
+        await asyncio.sleep(CONFIG_FLUSH_DELAY)
+        _CONFIG_DIRTY.clear()
+        try:
+            await save_config_async()
+        except Exception:
+            _CONFIG_DIRTY.set()
+            logger.exception("Erreur lors de la sauvegarde de la configuration, nouvel essai au prochain passage")
+
+rebuild_button_index()
+
 # Fonctions de gestion du catalogue
 def load_catalog():
     try:
-        with open(CONFIG['catalog_file'], 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(CONFIG['catalog_file'], 'rb') as f:
+            return json_loads(f.read())
     except FileNotFoundError:
         return {}
 
 def save_catalog(catalog):
-    with open(CONFIG['catalog_file'], 'w', encoding='utf-8') as f:
-        json.dump(catalog, f, indent=4, ensure_ascii=False)
+    # Indentation de 4 espaces comme les fichiers existants (orjson ne sait indenter qu'à 2)
+    data = json.dumps(catalog, indent=4, ensure_ascii=False).encode('utf-8')
+    write_file_atomic(CONFIG['catalog_file'], data)
+
+# Écriture différée du catalogue : les handlers marquent le catalogue comme modifié
+# et une seule tâche de fond l'écrit sur disque au plus une fois par intervalle
+CATALOG_FLUSH_DELAY = 2.0
+_CATALOG_DIRTY = asyncio.Event()
+_catalog_flush_task = None
+
+# Version du catalogue et des statistiques, incrémentée à chaque modification :
+# la page de statistiques n'est reconstruite que lorsqu'elle change
+_STATS_VERSION = 0
+_STATS_RENDER_CACHE = {'version': -1, 'text': ''}
+# Version de la structure du catalogue (catégories et produits, hors statistiques)
+_CATALOG_VERSION = 0
+_CATEGORY_MENU_CACHE = {'version': -1, 'markup': None}
+
+def mark_catalog_dirty(structure=True):
+    """
+    Signale que CATALOG a été modifié et doit être sauvegardé.
+    structure=False pour une modification qui ne touche que les statistiques.
+    """
+    global _STATS_VERSION, _CATALOG_VERSION
+    if structure:
+        rebuild_catalog_indexes()
+        _CATALOG_VERSION += 1
+    _STATS_VERSION += 1
+    _CATALOG_DIRTY.set()
+
+async def _catalog_flusher():
+    """Tâche de fond qui regroupe les modifications du catalogue en une seule écriture"""
+    while True:
+        await _CATALOG_DIRTY.wait()
+        await asyncio.sleep(CATALOG_FLUSH_DELAY)
+        _CATALOG_DIRTY.clear()
+        try:
+            await asyncio.to_thread(save_catalog, CATALOG)
+        except Exception:
+            _CATALOG_DIRTY.set()
+            logger.exception("Erreur lors de la sauvegarde du catalogue, nouvel essai au prochain passage")
 
 def clean_stats():
     """Nettoie les statistiques des produits et catégories qui n'existent plus"""
-    if 'stats' not in CATALOG:
+    stats = CATALOG.get('stats')
+    if stats is None:
         return
     
-    stats = CATALOG['stats']
-    
+    removed = False
+
     # Nettoyer les vues par catégorie
-    if 'category_views' in stats:
-        categories_to_remove = []
-        for category in stats['category_views']:
-            if category not in CATALOG or category == 'stats':
-                categories_to_remove.append(category)
-        
-        for category in categories_to_remove:
-            del stats['category_views'][category]
-            print(f"🧹 Suppression des stats de la catégorie: {category}")
+    category_views = stats.get('category_views')
+    if category_views is not None:
+        stale_categories = category_views.keys() - CATALOG_INDEX.keys()
+        for category in stale_categories:
+            del category_views[category]
+            logger.info("🧹 Suppression des stats de la catégorie: %s", category)
+        removed = bool(stale_categories)
 
     # Nettoyer les vues par produit
-    if 'product_views' in stats:
+    all_product_views = stats.get('product_views')
+    if all_product_views is not None:
         categories_to_remove = []
-        for category in stats['product_views']:
-            if category not in CATALOG or category == 'stats':
+        for category, product_views in all_product_views.items():
+            existing_products = CATALOG_INDEX.get(category)
+            if existing_products is None:
                 categories_to_remove.append(category)
                 continue
             
-            products_to_remove = []
-            existing_products = [p['name'] for p in CATALOG[category]]
-            
-            for product_name in stats['product_views'][category]:
-                if product_name not in existing_products:
-                    products_to_remove.append(product_name)
-            
             # Supprimer les produits qui n'existent plus
-            for product in products_to_remove:
-                del stats['product_views'][category][product]
-                print(f"🧹 Suppression des stats du produit: {product} dans {category}")
+            for product in product_views.keys() - existing_products:
+                del product_views[product]
+                removed = True
+                logger.info("🧹 Suppression des stats du produit: %s dans %s", product, category)
             
             # Si la catégorie est vide après nettoyage, la marquer pour suppression
-            if not stats['product_views'][category]:
+            if not product_views:
                 categories_to_remove.append(category)
         
         # Supprimer les catégories vides
         for category in categories_to_remove:
-            if category in stats['product_views']:
-                del stats['product_views'][category]
+            del all_product_views[category]
+        removed = removed or bool(categories_to_remove)
+
+    # Mettre à jour la date de dernière modification si quelque chose a été supprimé
+    if removed:
+        stats['last_updated'] = _now_str()
+        mark_catalog_dirty(structure=False)
+
+_NOW_CACHE = {'second': -1, 'text': ''}
+
+def _now_str():
+    """Horodatage ISO à l'heure de Paris, recalculé au plus une fois par seconde"""
+    second = int(time.time())
+    if second != _NOW_CACHE['second']:
+        _NOW_CACHE['text'] = datetime.now(paris_tz).isoformat(timespec='seconds')
+        _NOW_CACHE['second'] = second
+    return _NOW_CACHE['text']
+
+def _ensure_stats():
+    """Renvoie CATALOG['stats'], initialisé au premier besoin"""
+    stats = CATALOG.get('stats')
+    if stats is None:
+        now = _now_str()
+        stats = CATALOG['stats'] = {
+            "total_views": 0,
+            "category_views": {},
+            "product_views": {},
+            "last_updated": now,
+            "last_reset": now[:10]
+        }
+    return stats
 
-    # Mettre à jour la date de dernière modification
-    stats['last_updated'] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    save_catalog(CATALOG)
+def build_stats_text():
+    """Construit le texte de la page de statistiques à partir de CATALOG['stats']"""
+    _ensure_stats()
 
-def get_stats():
-    global STATS_CACHE, LAST_CACHE_UPDATE
-    current_time = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    
-    # Si le cache existe et a moins de 30 secondes
-    if STATS_CACHE and LAST_CACHE_UPDATE and (current_time - LAST_CACHE_UPDATE).seconds < 30:
-        return STATS_CACHE
-        
-    # Sinon, lire le fichier et mettre à jour le cache
-    STATS_CACHE = load_catalog()['stats']
-    LAST_CACHE_UPDATE = current_time
-    return STATS_CACHE
+    # Nettoyer les stats avant l'affichage
+    clean_stats()
+
+    stats = CATALOG['stats']
+    text = "📊 *Statistiques du catalogue*\n\n"
+    text += f"👥 Vues totales: {stats.get('total_views', 0)}\n"
+
+    # last_updated est un horodatage ISO déjà à l'heure de Paris, n'en garder que l'heure
+    # (les anciennes valeurs "HH:MM:SS" sont affichées telles quelles)
+    last_updated = stats.get('last_updated', 'Jamais')
+    if 'T' in last_updated:
+        last_updated = last_updated.split('T', 1)[1][:8]
+    elif len(last_updated) > 8:
+        # Ancien format complet "AAAA-MM-JJ HH:MM:SS", écrit en UTC
+        try:
+            dt = datetime.strptime(last_updated, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+            last_updated = dt.astimezone(paris_tz).strftime("%H:%M:%S")
+        except ValueError:
+            logger.warning("Date de mise à jour illisible: %s", last_updated)
+
+    text += f"🕒 Dernière mise à jour: {last_updated}\n"
+
+    if 'last_reset' in stats:
+        text += f"🔄 Dernière réinitialisation: {stats.get('last_reset', 'Jamais')}\n"
+    text += "\n"
+
+    # Le reste du code reste identique
+    text += "📈 *Vues par catégorie:*\n"
+    category_views = stats.get('category_views', {})
+    if category_views:
+        sorted_categories = sorted(category_views.items(), key=itemgetter(1), reverse=True)
+        for category, views in sorted_categories:
+            if category in CATALOG:
+                text += f"- {category}: {views} vues\n"
+    else:
+        text += "Aucune vue enregistrée.\n"
+
+    text += "\n━━━━━━━━━━━━━━━\n\n"
+
+    text += "🔥 *Produits les plus populaires:*\n"
+    product_views = stats.get('product_views', {})
+    if product_views:
+        all_products = []
+        for category, products in product_views.items():
+            # Produits existants de la catégorie, recherche en O(1) dans l'index
+            existing_products = CATALOG_INDEX.get(category)
+            if not existing_products:
+                continue
+            for product_name, views in products.items():
+                if product_name in existing_products:
+                    all_products.append((category, product_name, views))
 
-def backup_data():
+        sorted_products = heapq.nlargest(5, all_products, key=itemgetter(2))
+        for category, product_name, views in sorted_products:
+            text += f"- {product_name} ({category}): {views} vues\n"
+    else:
+        text += "Aucune vue enregistrée sur les produits.\n"
+
+    return text
+
+async def backup_data():
     """Crée une sauvegarde des fichiers de données"""
     backup_dir = "backups"
-    if not os.path.exists(backup_dir):
-        os.makedirs(backup_dir)
+    os.makedirs(backup_dir, exist_ok=True)
     
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    # Backup config.json
-    if os.path.exists("config/config.json"):
-        shutil.copy2("config/config.json", f"{backup_dir}/config_{timestamp}.json")
-    
-    # Backup catalog.json
-    if os.path.exists("config/catalog.json"):
-        shutil.copy2("config/catalog.json", f"{backup_dir}/catalog_{timestamp}.json")
+    # Copier config.json et catalog.json en parallèle, un fichier absent est ignoré
+    results = await asyncio.gather(
+        asyncio.to_thread(shutil.copy2, "config/config.json", f"{backup_dir}/config_{timestamp}.json"),
+        asyncio.to_thread(shutil.copy2, "config/catalog.json", f"{backup_dir}/catalog_{timestamp}.json"),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception) and not isinstance(result, FileNotFoundError):
+            logger.error("Erreur lors de la sauvegarde", exc_info=result)
+
+async def edit_if_changed(query, text, reply_markup=None, **kwargs):
+    """
+    Modifie le message du callback uniquement si le texte ou le clavier change.
+    Renvoie le message affiché.
+    """
+    message = query.message
+    if message is not None and message.text == text and message.reply_markup == reply_markup:
+        return message
+    try:
+        return await query.edit_message_text(text=text, reply_markup=reply_markup, **kwargs)
+    except BadRequest as e:
+        # Le texte envoyé avec parse_mode diffère du texte affiché : Telegram tranche
+        if "message is not modified" in str(e).lower():
+            return message
+        raise
+
+async def _delayed_delete(message, delay):
+    """Supprime un message après `delay` secondes, à lancer en tâche de fond"""
+    await asyncio.sleep(delay)
+    try:
+        await message.delete()
+    except Exception:
+        pass
+
+def schedule_delete(context, message, delay=3):
+    """Programme la suppression de `message` sans bloquer le handler appelant"""
+    context.application.create_task(_delayed_delete(message, delay))
+
+async def confirm_in_prompt(context, chat_id, user_message_id, prompt_id, text):
+    """
+    Remplace le texte de la demande `prompt_id` par la confirmation (ou l'envoie si la demande
+    est inconnue), supprime la réponse de l'utilisateur et programme la suppression de la confirmation
+    """
+    async def confirm():
+        if prompt_id is not None:
+            try:
+                return await context.bot.edit_message_text(
+                    chat_id=chat_id, message_id=prompt_id, text=text, parse_mode='HTML'
+                )
+            except BadRequest as e:
+                # Demande supprimée ou trop ancienne : envoyer la confirmation à part
+                logger.debug("Demande %s non modifiable: %s", prompt_id, e)
+        return await context.bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML')
+
+    _, message = await asyncio.gather(
+        delete_many(context.bot, chat_id, [user_message_id]),
+        confirm()
+    )
+    schedule_delete(context, message)
+
+async def send_product_media(bot, chat_id, media, caption, reply_markup):
+    """
+    Envoie le média d'un produit (photo ou vidéo) avec sa légende.
+    Si l'envoi échoue, envoie la légende seule avec un avertissement.
+    """
+    try:
+        if media['media_type'] == 'photo':
+            return await bot.send_photo(
+                chat_id=chat_id, photo=media['media_id'], caption=caption,
+                reply_markup=reply_markup, parse_mode='HTML'
+            )
+        return await bot.send_video(
+            chat_id=chat_id, video=media['media_id'], caption=caption,
+            reply_markup=reply_markup, parse_mode='HTML'
+        )
+    except Exception:
+        logger.exception("Erreur lors de l'envoi du média")
+        return await bot.send_message(
+            chat_id=chat_id,
+            text=f"{caption}\n\n⚠️ Le média n'a pas pu être chargé",
+            reply_markup=reply_markup,
+            parse_mode='HTML'
+        )
+
+# Clés temporaires des assistants, retirées à la fin du parcours sans vider
+# le reste de user_data (bannière, menu, navigation...)
+PRODUCT_WIZARD_KEYS = ('wizard', 'editing_category', 'editing_product', 'prev_prompt_id')
+# Claviers à un seul bouton réutilisés tels quels : PTB ne modifie pas le markup transmis
+_CANCEL_ADD_PRODUCT_MARKUP = InlineKeyboardMarkup([[
+    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_product")
+]])
+_BACK_TO_ADMIN_MARKUP = InlineKeyboardMarkup([[
+    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
+]])
+_BACK_TO_CUSTOM_BUTTONS_MARKUP = InlineKeyboardMarkup([[
+    InlineKeyboardButton("🔙 Retour", callback_data="show_custom_buttons")
+]])
+_CANCEL_ADD_CATEGORY_MARKUP = InlineKeyboardMarkup([[
+    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_category")
+]])
+_CANCEL_EDIT_MARKUP = InlineKeyboardMarkup([[
+    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")
+]])
+_CANCEL_EDIT_CONTACT_MARKUP = InlineKeyboardMarkup([[
+    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit_contact")
+]])
+_CANCEL_EDIT_ORDER_MARKUP = InlineKeyboardMarkup([[
+    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit_order")
+]])
+_CANCEL_EDIT_WELCOME_MARKUP = InlineKeyboardMarkup([[
+    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit_welcome")
+]])
+BUTTON_WIZARD_KEYS = ('temp_button', 'editing_button_id', 'editing_button_field', 'messages_to_delete')
+
+def product_wizard(context):
+    """État de l'assistant produit, regroupé dans un seul dict de user_data"""
+    return context.user_data.setdefault('wizard', {})
+
+def clear_user_keys(context, keys):
+    """Retire de user_data les clés indiquées"""
+    for key in keys:
+        context.user_data.pop(key, None)
+
+async def delete_prev_prompt(update, context, *extra_ids):
+    """Supprime la dernière demande de saisie enregistrée et les messages `extra_ids`"""
+    message_ids = list(extra_ids)
+    prompt_id = context.user_data.pop('prev_prompt_id', None)
+    if prompt_id:
+        message_ids.append(prompt_id)
+    await delete_many(context.bot, update.effective_chat.id, message_ids)
+
+# Messages du bot à nettoyer lors du retour au menu d'administration
+MESSAGES_TO_DELETE = (
+    'menu_message_id', 'banner_message_id', 'category_message_id',
+    'last_product_message_id', 'initial_welcome_message_id', 'instruction_message_id'
+)
+
+async def delete_many(bot, chat_id, message_ids):
+    """
+    Supprime plusieurs messages avec deleteMessages (100 IDs maximum par appel).
+    Telegram ignore les messages introuvables ; renvoie la liste des erreurs sans les lever.
+    Les IDs None (message jamais enregistré) sont ignorés.
+    """
+    message_ids = list(dict.fromkeys(i for i in message_ids if i is not None))
+    results = await asyncio.gather(
+        *(bot.delete_messages(chat_id=chat_id, message_ids=message_ids[i:i + 100])
+          for i in range(0, len(message_ids), 100)),
+        return_exceptions=True
+    )
+    return [result for result in results if isinstance(result, Exception)]
 
 def print_catalog_debug():
     """Fonction de debug pour afficher le contenu du catalogue"""
-    for category, products in CATALOG.items():
-        if category != 'stats':
-            print(f"\nCatégorie: {category}")
-            for product in products:
-                print(f"  Produit: {product['name']}")
-                if 'media' in product:
-                    print(f"    Médias ({len(product['media'])}): {product['media']}")
+    for category in CATALOG_CATEGORIES:
+        print(f"\nCatégorie: {category}")
+        for product in CATALOG[category]:
+            print(f"  Produit: {product['name']}")
+            if 'media' in product:
+                print(f"    Médias ({len(product['media'])}): {product['media']}")
+
+# Expressions régulières compilées une seule fois pour tout le module
+_PATTERNS = {
+    'emoji': re.compile("["
+        u"\U0001F600-\U0001F64F"  # emoticons
+        u"\U0001F300-\U0001F5FF"  # symbols & pictographs
+        u"\U0001F680-\U0001F6FF"  # transport & map symbols
+        u"\U0001F1E0-\U0001F1FF"  # flags (iOS)
+        u"\U00002702-\U000027B0"
+        u"\U000024C2-\U0001F251"
+        "]+", flags=re.UNICODE),
+    'callback_unsafe': re.compile(r'[^\w\s\-_]'),
+    'callback_safe_data': re.compile(r'[^\w\-]'),
+    'tg_username': re.compile(r'^[a-zA-Z0-9_]{5,32}\Z'),
+}
+
+def match(name, text):
+    """Applique le motif précompilé `name` au début de `text`"""
+    return _PATTERNS[name].match(text)
+
+# Préfixes d'URL et séparateurs qui distinguent une URL/un texte d'un pseudo Telegram
+_URL_SCHEMES = ('http://', 'https://')
+_SEP_CHARS = frozenset(' /?=&')
 
 def sanitize_callback_data(text):
     """Sanitize text for use in callback_data by removing special characters and encoding"""
     # Remove emojis and special characters, keep only alphanumeric, spaces, and basic punctuation
-    text = re.sub(r'[^\w\s\-_]', '', text)
+    text = _PATTERNS['callback_unsafe'].sub('', text)
     # Limit length and replace spaces with underscores
     text = text.strip().replace(' ', '_')[:20]
     return text
@@ -195,7 +545,7 @@ def create_safe_callback_data(prefix, data, max_length=64):
     short_hash = hash_object.hexdigest()[:8]
     
     # Nettoyer la donnée pour le callback
-    safe_data = re.sub(r'[^\w\-]', '_', data)
+    safe_data = _PATTERNS['callback_safe_data'].sub('_', data)
     safe_data = safe_data[:10]  # Garde les 10 premiers caractères
     
     # Combine le préfixe, la donnée sécurisée et le hash
@@ -209,19 +559,29 @@ def create_safe_callback_data(prefix, data, max_length=64):
 
 def get_sibling_products(category, product_name, user_id=None):
     products = CATALOG[category]
+    groups = admin_features.get_groups()
+    # Groupes de l'utilisateur, calculés une seule fois et non pour chaque produit
+    user_groups = {group_name for group_name, members in groups.items() if user_id in members}
+    # Rang de chaque groupe : si plusieurs noms de groupe sont préfixes du produit
+    # (ex. "vip" et "vip_gold"), le premier dans l'ordre de `groups` décide
+    group_rank = {group_name: rank for rank, group_name in enumerate(groups)}
+
     # Filtrer d'abord les produits selon les permissions
     visible_products = []
     
     for product in products:
-        show_product = True
-        # Vérifier les permissions de groupe pour chaque produit
-        for group_name in admin_features._access_codes.get("groups", {}).keys():
-            if product['name'].startswith(f"{group_name}_"):
-                # Si le produit appartient à un groupe, vérifier si l'utilisateur est membre
-                if user_id not in admin_features._access_codes["groups"][group_name]:
-                    show_product = False
-                break
-        if show_product:
+        # Si le produit appartient à un groupe, vérifier si l'utilisateur est membre.
+        # Un nom de groupe peut contenir "_" : tester le préfixe devant chaque "_"
+        name = product['name']
+        owner = None
+        if group_rank:
+            end = name.find('_')
+            while end != -1:
+                prefix = name[:end]
+                if prefix in group_rank and (owner is None or group_rank[prefix] < group_rank[owner]):
+                    owner = prefix
+                end = name.find('_', end + 1)
+        if owner is None or owner in user_groups:
             visible_products.append(product)
     
     # Maintenant chercher dans les produits visibles
@@ -242,6 +602,60 @@ def get_original_data(callback_data):
     """Récupère les données originales à partir du callback_data"""
     return CALLBACK_DATA_MAPPING.get(callback_data)
 
+def safe_callback_button(prefix, data, label):
+    """Bouton dont le callback_data sécurisé est enregistré dans CALLBACK_DATA_MAPPING"""
+    safe_callback = create_safe_callback_data(prefix, data)
+    store_callback_mapping(safe_callback, data)
+    return InlineKeyboardButton(label[:50], callback_data=safe_callback)  # Limite l'affichage à 50 caractères
+
+# Nombre de produits dont un utilisateur garde l'ID de navigation
+NAV_REGISTRY_SIZE = 128
+
+def register_nav_product(context, category, product_name):
+    """
+    Renvoie un ID court et stable pour un produit, utilisable dans un callback_data.
+    Le même produit garde le même ID pour un utilisateur, sans collision possible.
+    Seuls les NAV_REGISTRY_SIZE produits les plus récemment affichés sont conservés.
+    """
+    user_data = context.user_data
+    registry = user_data.setdefault('nav_registry', OrderedDict())
+    key = (category, product_name)
+    nav_id = registry.get(key)
+    if nav_id is not None:
+        registry.move_to_end(key)
+        return nav_id
+
+    # Compteur croissant : un ID libéré n'est jamais réattribué à un autre produit
+    nav_id = str(user_data.get('nav_counter', 0))
+    user_data['nav_counter'] = int(nav_id) + 1
+    registry[key] = nav_id
+    user_data[f'nav_product_{nav_id}'] = {
+        'category': category,
+        'name': product_name
+    }
+    if len(registry) > NAV_REGISTRY_SIZE:
+        _, old_id = registry.popitem(last=False)
+        user_data.pop(f'nav_product_{old_id}', None)
+    return nav_id
+
+# Nombre de boutons editp_ dont un utilisateur garde la cible
+EDIT_REF_SIZE = 256
+
+def register_edit_ref(context, category, product_name):
+    """
+    Renvoie le numéro d'un bouton editp_ pointant vers ce produit.
+    Les numéros viennent d'un compteur croissant : un bouton resté dans une
+    ancienne liste ne peut pas désigner le produit d'une liste plus récente.
+    """
+    user_data = context.user_data
+    refs = user_data.setdefault('_ref', OrderedDict())
+    ref_id = user_data.get('edit_ref_counter', 0)
+    user_data['edit_ref_counter'] = ref_id + 1
+    refs[ref_id] = (category, product_name)
+    if len(refs) > EDIT_REF_SIZE:
+        refs.popitem(last=False)
+    return ref_id
+
 # États de conversation
 WAITING_FOR_ACCESS_CODE = "WAITING_FOR_ACCESS_CODE"
 CHOOSING = "CHOOSING"
@@ -270,6 +684,66 @@ WAITING_BROADCAST_EDIT = "WAITING_BROADCAST_EDIT"
 # Charger le catalogue au démarrage
 CATALOG = load_catalog()
 
+# Index dérivés du catalogue, recalculés à chaque modification de sa structure
+SOLD_OUT_CATEGORIES = set()
+# catégorie -> nom -> produit, partage les dicts de CATALOG
+CATALOG_INDEX = {}
+# Catégories de produits dans l'ordre du catalogue, sans l'entrée 'stats'
+CATALOG_CATEGORIES = []
+# Catégories affichées "(SOLD OUT ❌)" : vides ou ne contenant que le produit SOLD OUT
+UNAVAILABLE_CATEGORIES = set()
+
+def _media_order(media):
+    return media.get('order_index', 0)
+
+def rebuild_catalog_indexes():
+    """Recalcule les index dérivés de CATALOG"""
+    CATALOG_INDEX.clear()
+    for category, products in CATALOG.items():
+        if category != 'stats':
+            # Parcours inversé : en cas de doublon, le premier produit de la liste l'emporte
+            CATALOG_INDEX[category] = {p.get('name'): p for p in reversed(products) if isinstance(p, dict)}
+    # Médias triés une fois ici pour que l'affichage puisse les indexer directement
+    for products in CATALOG_INDEX.values():
+        for product in products.values():
+            if product.get('media'):
+                product['media'].sort(key=_media_order)
+    CATALOG_CATEGORIES[:] = CATALOG_INDEX
+    SOLD_OUT_CATEGORIES.clear()
+    SOLD_OUT_CATEGORIES.update(
+        category for category, products in CATALOG.items()
+        if category != 'stats' and len(products) == 1
+        and isinstance(products[0], dict) and products[0].get('name') == 'SOLD OUT ! ❌'
+    )
+    UNAVAILABLE_CATEGORIES.clear()
+    UNAVAILABLE_CATEGORIES.update(SOLD_OUT_CATEGORIES)
+    UNAVAILABLE_CATEGORIES.update(category for category in CATALOG_CATEGORIES if not CATALOG[category])
+
+def is_category_sold_out(category):
+    """Indique si la catégorie ne contient que le produit SOLD OUT"""
+    return category in SOLD_OUT_CATEGORIES
+
+def _clear_soldout(category):
+    """Retire le produit SOLD OUT d'une catégorie, renvoie True si elle a été vidée"""
+    if is_category_sold_out(category):
+        CATALOG[category].clear()
+        return True
+    return False
+
+rebuild_catalog_indexes()
+
+CATEGORY_MENU_TEXT = "📋 *Menu*\n\nChoisissez une catégorie pour voir les produits :"
+
+def category_menu_markup():
+    """Clavier du menu des catégories, reconstruit seulement quand le catalogue change"""
+    if _CATEGORY_MENU_CACHE['version'] != _CATALOG_VERSION:
+        keyboard = [[InlineKeyboardButton(category, callback_data=f"view_{category}")]
+                    for category in CATALOG_CATEGORIES]
+        keyboard.append([InlineKeyboardButton("🔙 Retour à l'accueil", callback_data="back_to_home")])
+        _CATEGORY_MENU_CACHE['markup'] = InlineKeyboardMarkup(keyboard)
+        _CATEGORY_MENU_CACHE['version'] = _CATALOG_VERSION
+    return _CATEGORY_MENU_CACHE['markup']
+
 # Fonctions de base
 
 async def handle_access_code(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -284,6 +758,7 @@ async def handle_access_code(update: Update, context: ContextTypes.DEFAULT_TYPE)
     except Exception as e:
         pass
 
+    # verify_code rejette d'abord, sans recherche ni écriture, une saisie qui n'a pas le format d'un code
     is_valid, reason = access_manager.verify_code(code, user_id)
     
     if is_valid:
@@ -292,21 +767,13 @@ async def handle_access_code(update: Update, context: ContextTypes.DEFAULT_TYPE)
             current_message_id = update.message.message_id
             
             # Supprimer les 15 derniers messages pour s'assurer que tout est nettoyé
-            for i in range(current_message_id - 15, current_message_id + 1):
-                try:
-                    await context.bot.delete_message(chat_id=chat_id, message_id=i)
-                except Exception as e:
-                    pass  # Ignorer silencieusement les erreurs de suppression
-                    
+            message_ids = list(range(current_message_id - 15, current_message_id + 1))
+
             # S'assurer que le message de bienvenue initial est supprimé
-            if 'initial_welcome_message_id' in context.user_data:
-                try:
-                    await context.bot.delete_message(
-                        chat_id=chat_id,
-                        message_id=context.user_data['initial_welcome_message_id']
-                    )
-                except Exception as e:
-                    pass
+            message_ids.append(context.user_data.get('initial_welcome_message_id'))
+
+            # Les erreurs de suppression sont ignorées silencieusement
+            await delete_many(context.bot, chat_id, message_ids)
                 
             # Nettoyer les données stockées
             context.user_data.clear()  # Nettoyer toutes les données stockées
@@ -335,7 +802,7 @@ async def handle_access_code(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 async def admin_generate_code(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Génère un nouveau code d'accès (commande admin)"""
-    if str(update.effective_user.id) not in ADMIN_IDS:
+    if update.effective_user.id not in ADMIN_IDS:
         await update.message.reply_text("❌ Cette commande est réservée aux administrateurs.")
         return
 
@@ -354,7 +821,7 @@ async def admin_generate_code(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def admin_list_codes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Liste tous les codes actifs (commande admin)"""
-    if str(update.effective_user.id) not in ADMIN_IDS:
+    if update.effective_user.id not in ADMIN_IDS:
         await update.message.reply_text("❌ Cette commande est réservée aux administrateurs.")
         return
 
@@ -364,14 +831,40 @@ async def admin_list_codes(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Aucun code actif.")
         return
 
-    message = "📝 Codes actifs :\n\n"
-    for code in active_codes:
-        exp_date = datetime.fromisoformat(code["expiration"])
-        exp_str = exp_date.strftime("%d/%m/%Y %H:%M")
-        message += f"Code: `{code['code']}`\n"
-        message += f"Expire le: {exp_str}\n\n"
+    parts = ["📝 Codes actifs :\n\n"]
+    parts.extend(
+        f"Code: `{code['code']}`\nExpire le: {code['expiration_fmt']}\n\n"
+        for code in active_codes
+    )
+
+    await update.message.reply_text(''.join(parts), parse_mode='Markdown')
+
+def get_home_menu_markup(is_admin):
+    """Renvoie le clavier d'accueil, construit une seule fois par version de CONFIG"""
+    key = (is_admin, _CONFIG_VERSION)
+    markup = _MENU_CACHE.get(key)
+    if markup is None:
+        keyboard = [
+            [InlineKeyboardButton("📋 MENU", callback_data="show_categories")]
+        ]
+
+        # Ajouter les boutons personnalisés
+        for button in CONFIG.get('custom_buttons', []):
+            if button['type'] == 'url':
+                keyboard.append([InlineKeyboardButton(button['name'], url=button['value'])])
+            elif button['type'] == 'text':
+                keyboard.append([InlineKeyboardButton(button['name'], callback_data=f"custom_text_{button['id']}")])
 
-    await update.message.reply_text(message, parse_mode='Markdown')
+        # Ajouter les boutons de contact et réseaux en colonne
+        keyboard.append([InlineKeyboardButton("📱 Réseaux", callback_data="show_networks")])
+
+        # Ajouter le bouton admin si l'utilisateur est administrateur
+        if is_admin:
+            keyboard.append([InlineKeyboardButton("🔧 Menu Admin", callback_data="admin")])
+
+        markup = InlineKeyboardMarkup(keyboard)
+        _MENU_CACHE[key] = markup
+    return markup
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
@@ -387,15 +880,13 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Enregistrer utilisateur
     await admin_features.register_user(user)
     
-    # Vérifier si l'utilisateur est autorisé
-    if not access_manager.is_authorized(user.id):
+    # Vérifier si l'utilisateur est autorisé (le bot est ouvert à tous si le code d'accès est désactivé)
+    if access_manager.is_access_code_enabled() and not access_manager.is_authorized(user.id):
         # Supprimer l'ancien message de bienvenue s'il existe
-        if 'initial_welcome_message_id' in context.user_data:
+        old_welcome_id = context.user_data.pop('initial_welcome_message_id', None)
+        if old_welcome_id is not None:
             try:
-                await context.bot.delete_message(
-                    chat_id=chat_id,
-                    message_id=context.user_data['initial_welcome_message_id']
-                )
+                await context.bot.delete_message(chat_id=chat_id, message_id=old_welcome_id)
             except Exception:
                 pass
         
@@ -408,41 +899,16 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         context.user_data['initial_welcome_message_id'] = welcome_msg.message_id
         return WAITING_FOR_ACCESS_CODE
     
-    # Supprimer les anciens messages si nécessaire
-    if 'menu_message_id' in context.user_data:
-        try:
-            await context.bot.delete_message(
-                chat_id=chat_id,
-                message_id=context.user_data['menu_message_id']
-            )
-        except:
-            pass
-    
-    # Supprimer l'ancienne bannière si elle existe
-    if 'banner_message_id' in context.user_data:
-        try:
-            await context.bot.delete_message(
-                chat_id=chat_id,
-                message_id=context.user_data['banner_message_id']
-            )
-            del context.user_data['banner_message_id']
-        except:
-            pass
+    # Supprimer l'ancien menu et l'ancienne bannière s'ils existent
+    await delete_many(context.bot, chat_id, [
+        context.user_data.pop(key)
+        for key in ('menu_message_id', 'banner_message_id')
+        if key in context.user_data
+    ])
     
-    # Nouveau clavier simplifié pour l'accueil
-    keyboard = [
-        [InlineKeyboardButton("📋 MENU", callback_data="show_categories")]
-    ]
+    # Clavier d'accueil mis en cache
+    reply_markup = get_home_menu_markup(user.id in ADMIN_IDS)
 
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
-    
-    # Ajouter les boutons personnalisés
-    for button in config.get('custom_buttons', []):
-        if button['type'] == 'url':
-            keyboard.append([InlineKeyboardButton(button['name'], url=button['value'])])
-        elif button['type'] == 'text':
-            keyboard.append([InlineKeyboardButton(button['name'], callback_data=f"custom_text_{button['id']}")])
     # Définir le texte de bienvenue ici, avant les boutons
     welcome_text = CONFIG.get('welcome_message', 
         "🌿 <b>Bienvenue sur votre bot !</b> 🌿\n\n"
@@ -450,16 +916,6 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "📋 Cliquez sur MENU pour voir les catégories"
     )
 
-    # Ajouter les boutons de contact et réseaux en colonne
-    keyboard.extend([
-        [InlineKeyboardButton("📱 Réseaux", callback_data="show_networks")]
-
-    ])
-
-    # Ajouter le bouton admin si l'utilisateur est administrateur
-    if str(update.effective_user.id) in ADMIN_IDS:
-        keyboard.append([InlineKeyboardButton("🔧 Menu Admin", callback_data="admin")])
-
     try:
         # Vérifier si une image banner est configurée
         if CONFIG.get('banner_image'):
@@ -473,7 +929,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         menu_message = await context.bot.send_message(
             chat_id=chat_id,
             text=welcome_text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=reply_markup,
             parse_mode='HTML'  
         )
         context.user_data['menu_message_id'] = menu_message.message_id
@@ -484,66 +940,62 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         menu_message = await context.bot.send_message(
             chat_id=chat_id,
             text=welcome_text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=reply_markup,
             parse_mode='HTML'
         )
         context.user_data['menu_message_id'] = menu_message.message_id
     
     return CHOOSING
 
+# Clavier des réseaux, entièrement statique
+NETWORKS_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("💨 Bouton 1", url="https://t.me/+aHbA9_8tdTQwYThk")
+    ],
+
+    [
+        InlineKeyboardButton("🥔 Bouton 2", url="https://dlj199.org/christianDry547")
+    ],
+    [
+        InlineKeyboardButton("📱 Bouton 3", url="https://www.instagram.com/christiandry.54?igsh=MWU1dXNrbXdpMzllNA%3D%3D&utm_source=qr")
+    ],
+
+    [
+        InlineKeyboardButton("🌐 Bouton 4", url="https://signal.group/#CjQKIJNEETZNr9_LRMvShQbblk_NUdDyabA7e_eyUQY6-ptsEhBSpXex0cjIoOEYQ4H3D8K5")
+    ],
+
+    [
+        InlineKeyboardButton("👻 Bouton 5", url="https://snapchat.com/t/0HumwTKi")
+    ],
+    [InlineKeyboardButton("🔙 Retour", callback_data="back_to_home")]
+])
+
 async def show_networks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Affiche tous les réseaux sociaux"""
     query = update.callback_query
     await query.answer()
 
-    keyboard = [
-        [
-            InlineKeyboardButton("💨 Bouton 1", url="https://t.me/+aHbA9_8tdTQwYThk")
-        ],
-
-        [
-            InlineKeyboardButton("🥔 Bouton 2", url="https://dlj199.org/christianDry547")
-        ],
-        [
-            InlineKeyboardButton("📱 Bouton 3", url="https://www.instagram.com/christiandry.54?igsh=MWU1dXNrbXdpMzllNA%3D%3D&utm_source=qr")
-        ],
-
-        [
-            InlineKeyboardButton("🌐 Bouton 4", url="https://signal.group/#CjQKIJNEETZNr9_LRMvShQbblk_NUdDyabA7e_eyUQY6-ptsEhBSpXex0cjIoOEYQ4H3D8K5")
-        ],
-
-        [
-            InlineKeyboardButton("👻 Bouton 5", url="https://snapchat.com/t/0HumwTKi")
-        ],
-        [InlineKeyboardButton("🔙 Retour", callback_data="back_to_home")]
-    ]
-
-    await query.edit_message_text(
+    await edit_if_changed(
+        query,
         "🌐 Voici nos réseaux :",
-        reply_markup=InlineKeyboardMarkup(keyboard)
+        reply_markup=NETWORKS_MARKUP
     )
     return CHOOSING
 
 async def admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Commande pour accéder au menu d'administration"""
-    if str(update.effective_user.id) in ADMIN_IDS:
+    if update.effective_user.id in ADMIN_IDS:
         # Supprimer le message /admin
         await update.message.delete()
         
         # Supprimer les anciens messages si leurs IDs sont stockés
-        messages_to_delete = ['menu_message_id', 'banner_message_id', 'category_message_id', 
-                            'last_product_message_id', 'instruction_message_id']
-        
-        for message_key in messages_to_delete:
-            if message_key in context.user_data:
-                try:
-                    await context.bot.delete_message(
-                        chat_id=update.effective_chat.id,
-                        message_id=context.user_data[message_key]
-                    )
-                    del context.user_data[message_key]
-                except Exception as e:
-                    print(f"Erreur lors de la suppression du message {message_key}: {e}")
+        errors = await delete_many(
+            context.bot,
+            update.effective_chat.id,
+            [context.user_data.pop(key) for key in MESSAGES_TO_DELETE if key in context.user_data]
+        )
+        for error in errors:
+            logger.warning("Erreur lors de la suppression des messages: %s", error)
         
         # Envoyer la bannière d'abord si elle existe
         if CONFIG.get('banner_image'):
@@ -553,36 +1005,47 @@ async def admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     photo=CONFIG['banner_image']
                 )
                 context.user_data['banner_message_id'] = banner_message.message_id
-            except Exception as e:
-                print(f"Erreur lors de l'envoi de la bannière: {e}")
+            except Exception:
+                logger.exception("Erreur lors de l'envoi de la bannière")
         
         return await show_admin_menu(update, context)
     else:
         await update.message.reply_text("❌ Vous n'êtes pas autorisé à accéder au menu d'administration.")
         return ConversationHandler.END
 
+# Boutons fixes du menu d'administration, construits une seule fois.
+# Seule la ligne du code d'accès dépend de l'état courant.
+_ADMIN_MENU_PREFIX = [
+    [InlineKeyboardButton("➕ Ajouter une catégorie", callback_data="add_category")],
+    [InlineKeyboardButton("➕ Ajouter un produit", callback_data="add_product")],
+    [InlineKeyboardButton("❌ Supprimer une catégorie", callback_data="delete_category")],
+    [InlineKeyboardButton("❌ Supprimer un produit", callback_data="delete_product")],
+    [InlineKeyboardButton("✏️ Modifier une catégorie", callback_data="edit_category")],
+    [InlineKeyboardButton("✏️ Modifier un produit", callback_data="edit_product")],
+    [InlineKeyboardButton("🎯 Gérer boutons accueil", callback_data="show_custom_buttons")],
+]
+_ADMIN_MENU_SUFFIX = [
+    [InlineKeyboardButton("📊 Statistiques", callback_data="show_stats")],
+    [InlineKeyboardButton("🛒 Modifier bouton Commander", callback_data="edit_order_button")],
+    [InlineKeyboardButton("🏠 Modifier message d'accueil", callback_data="edit_welcome")],
+    [InlineKeyboardButton("🖼️ Modifier image bannière", callback_data="edit_banner_image")],
+    [InlineKeyboardButton("📢 Gestion annonces", callback_data="manage_broadcasts")],
+    [InlineKeyboardButton("🔙 Retour à l'accueil", callback_data="back_to_home")]
+]
+_ACCESS_CODE_ROWS = {
+    enabled: [InlineKeyboardButton(
+        f"🔒 Code d'accès: {'✅ Activé' if enabled else '❌ Désactivé'}",
+        callback_data="toggle_access_code"
+    )]
+    for enabled in (True, False)
+}
+
 async def show_admin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Affiche le menu d'administration"""
     is_enabled = access_manager.is_access_code_enabled()
-    status_text = "✅ Activé" if is_enabled else "❌ Désactivé"
-    info_status = "✅ Activé" if CONFIG.get('info_button_enabled', True) else "❌ Désactivé"
 
-    keyboard = [
-        [InlineKeyboardButton("➕ Ajouter une catégorie", callback_data="add_category")],
-        [InlineKeyboardButton("➕ Ajouter un produit", callback_data="add_product")],
-        [InlineKeyboardButton("❌ Supprimer une catégorie", callback_data="delete_category")],
-        [InlineKeyboardButton("❌ Supprimer un produit", callback_data="delete_product")],
-        [InlineKeyboardButton("✏️ Modifier une catégorie", callback_data="edit_category")],
-        [InlineKeyboardButton("✏️ Modifier un produit", callback_data="edit_product")],
-        [InlineKeyboardButton("🎯 Gérer boutons accueil", callback_data="show_custom_buttons")],
-        [InlineKeyboardButton(f"🔒 Code d'accès: {status_text}", callback_data="toggle_access_code")],
-        [InlineKeyboardButton("📊 Statistiques", callback_data="show_stats")],
-        [InlineKeyboardButton("🛒 Modifier bouton Commander", callback_data="edit_order_button")],
-        [InlineKeyboardButton("🏠 Modifier message d'accueil", callback_data="edit_welcome")],  
-        [InlineKeyboardButton("🖼️ Modifier image bannière", callback_data="edit_banner_image")],
-        [InlineKeyboardButton("📢 Gestion annonces", callback_data="manage_broadcasts")],
-        [InlineKeyboardButton("🔙 Retour à l'accueil", callback_data="back_to_home")]
-    ]
+    # Nouvelle liste à chaque appel : add_user_buttons insère des lignes dedans
+    keyboard = _ADMIN_MENU_PREFIX + [_ACCESS_CODE_ROWS[bool(is_enabled)]] + _ADMIN_MENU_SUFFIX
     keyboard = await admin_features.add_user_buttons(keyboard)
 
     admin_text = (
@@ -592,7 +1055,8 @@ async def show_admin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     try:
         if update.callback_query:
-            message = await update.callback_query.edit_message_text(
+            message = await edit_if_changed(
+                update.callback_query,
                 admin_text,
                 reply_markup=InlineKeyboardMarkup(keyboard),
                 parse_mode='Markdown'
@@ -628,8 +1092,9 @@ async def show_info(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     keyboard = [[InlineKeyboardButton("🔙 Retour", callback_data="back_to_home")]]
 
-    await query.edit_message_text(
-        text=info_text,
+    await edit_if_changed(
+        query,
+        info_text,
         reply_markup=InlineKeyboardMarkup(keyboard),
         parse_mode='HTML'
     )
@@ -652,26 +1117,24 @@ async def edit_info(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ]]),
         parse_mode='HTML'
     )
+    context.user_data['info_prompt_msg_id'] = query.message.message_id
     return WAITING_INFO_MESSAGE
 
 async def handle_info_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Gère la réception du nouveau message d'information"""
-    new_info = update.message.text_html if hasattr(update.message, 'text_html') else update.message.text
+    new_info = update.message.text_html or update.message.text
 
     # Sauvegarder le nouveau message dans la config
     CONFIG['info_message'] = new_info
-    with open('config/config.json', 'w', encoding='utf-8') as f:
-        json.dump(CONFIG, f, indent=4)
+    await save_config_async()
 
-    # Supprimer le message de l'utilisateur et le message précédent
-    try:
-        await update.message.delete()
-        await context.bot.delete_message(
-            chat_id=update.effective_chat.id,
-            message_id=update.message.message_id - 1
-        )
-    except Exception as e:
-        print(f"Erreur lors de la suppression des messages : {e}")
+    # Supprimer le message de l'utilisateur et la demande de saisie
+    message_ids = [update.message.message_id]
+    prompt_id = context.user_data.pop('info_prompt_msg_id', None)
+    if prompt_id:
+        message_ids.append(prompt_id)
+    for error in await delete_many(context.bot, update.effective_chat.id, message_ids):
+        logger.warning("Erreur lors de la suppression des messages: %s", error)
 
     # Message de confirmation
     success_msg = await context.bot.send_message(
@@ -680,15 +1143,14 @@ async def handle_info_message(update: Update, context: ContextTypes.DEFAULT_TYPE
         parse_mode='HTML'
     )
 
-    # Attendre 3 secondes et supprimer le message de confirmation
-    await asyncio.sleep(3)
-    await success_msg.delete()
+    # Supprimer le message de confirmation dans 3 secondes, sans bloquer
+    schedule_delete(context, success_msg)
 
     return await show_admin_menu(update, context)
 
 async def handle_new_category_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Gère la modification du nom d'une catégorie"""
-    if str(update.message.from_user.id) not in ADMIN_IDS:
+    if update.message.from_user.id not in ADMIN_IDS:
         return
 
     new_name = update.message.text
@@ -708,17 +1170,14 @@ async def handle_new_category_name(update: Update, context: ContextTypes.DEFAULT
         products = CATALOG[old_name]
         del CATALOG[old_name]
         CATALOG[new_name] = products
-        save_catalog(CATALOG)
+        mark_catalog_dirty()
 
-        # Supprimer les messages précédents
-        try:
-            await context.bot.delete_message(
-                chat_id=update.effective_chat.id,
-                message_id=update.message.message_id - 1
-            )
-            await update.message.delete()
-        except:
-            pass
+        # Supprimer la demande de saisie et le message de l'utilisateur
+        message_ids = [update.message.message_id]
+        prompt_id = context.user_data.pop('category_prompt_msg_id', None)
+        if prompt_id:
+            message_ids.append(prompt_id)
+        await delete_many(context.bot, update.effective_chat.id, message_ids)
 
         # Message de confirmation
         await context.bot.send_message(
@@ -774,20 +1233,17 @@ async def start_add_custom_button(update: Update, context: ContextTypes.DEFAULT_
 async def handle_order_button_config(update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Gère la configuration du bouton Commander"""
         # Utiliser text_html pour capturer le formatage, sinon utiliser le texte normal
-        new_config = update.message.text_html if hasattr(update.message, 'text_html') else update.message.text.strip()
+        new_config = update.message.text_html or update.message.text.strip()
     
         try:
-            # Supprimer le message de l'utilisateur
-            await update.message.delete()
-        
             # Mettre à jour la config selon le format
-            if new_config.startswith(('http://', 'https://')):
+            if new_config.startswith(_URL_SCHEMES):
                 CONFIG['order_url'] = new_config
                 CONFIG['order_text'] = None
                 CONFIG['order_telegram'] = None
                 button_type = "URL"
             # Vérifie si c'est un pseudo Telegram (avec ou sans @)
-            elif new_config.startswith('@') or not any(c in new_config for c in ' /?=&'):
+            elif new_config.startswith('@') or _SEP_CHARS.isdisjoint(new_config):
                 # Enlever le @ si présent
                 username = new_config[1:] if new_config.startswith('@') else new_config
                 CONFIG['order_telegram'] = username
@@ -800,39 +1256,29 @@ async def handle_order_button_config(update: Update, context: ContextTypes.DEFAU
                 CONFIG['order_telegram'] = None
                 button_type = "texte"
             
-            # Sauvegarder dans config.json
-            with open('config/config.json', 'w', encoding='utf-8') as f:
-                json.dump(CONFIG, f, indent=4)
-        
-            # Supprimer l'ancien message si possible
-            if 'edit_order_button_message_id' in context.user_data:
-                try:
-                    await context.bot.delete_message(
-                        chat_id=update.effective_chat.id,
-                        message_id=context.user_data['edit_order_button_message_id']
-                    )
-                except:
-                    pass
-        
             # Message de confirmation avec le @ ajouté si c'est un pseudo Telegram sans @
             display_value = new_config
             if button_type == "Telegram" and not new_config.startswith('@'):
                 display_value = f"@{new_config}"
-            
-            success_message = await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text=f"✅ Configuration du bouton Commander mise à jour avec succès!\n\n"
-                     f"Type: {button_type}\n"
-                     f"Valeur: {display_value}",
-                parse_mode='HTML'
+
+            # Messages à supprimer : celui de l'utilisateur et l'ancien message de configuration
+            message_ids = [update.message.message_id, context.user_data.pop('edit_order_button_message_id', None)]
+
+            # Sauvegarde, suppressions et confirmation sont indépendantes : les lancer ensemble
+            _, _, success_message = await asyncio.gather(
+                save_config_async(),
+                delete_many(context.bot, update.effective_chat.id, message_ids),
+                context.bot.send_message(
+                    chat_id=update.effective_chat.id,
+                    text=f"✅ Configuration du bouton Commander mise à jour avec succès!\n\n"
+                         f"Type: {button_type}\n"
+                         f"Valeur: {display_value}",
+                    parse_mode='HTML'
+                )
             )
         
-            # Attendre 3 secondes puis supprimer le message de confirmation
-            await asyncio.sleep(3)
-            try:
-                await success_message.delete()
-            except:
-                pass
+            # Supprimer le message de confirmation dans 3 secondes, sans bloquer
+            schedule_delete(context, success_message)
         
             return await show_admin_menu(update, context)
         
@@ -845,16 +1291,10 @@ async def handle_button_name(update: Update, context: ContextTypes.DEFAULT_TYPE)
     button_name = update.message.text
     chat_id = update.effective_chat.id
     
-    # Supprimer le message de l'utilisateur
-    await update.message.delete()
-    
-    # Supprimer tous les messages précédents stockés
+    # Supprimer le message de l'utilisateur et tous les messages précédents stockés
     messages_to_delete = context.user_data.get('messages_to_delete', [])
-    for msg_id in messages_to_delete:
-        try:
-            await context.bot.delete_message(chat_id=chat_id, message_id=msg_id)
-        except Exception as e:
-            print(f"Erreur lors de la suppression du message {msg_id}: {e}")
+    for error in await delete_many(context.bot, chat_id, [update.message.message_id, *messages_to_delete]):
+        logger.warning("Erreur lors de la suppression des messages: %s", error)
     
     # Mode création
     context.user_data['temp_button'] = {'name': button_name}
@@ -880,13 +1320,10 @@ async def start_edit_button_name(update: Update, context: ContextTypes.DEFAULT_T
     query = update.callback_query
     await query.answer()
     
-    button_id = query.data.replace("edit_button_name_", "")
+    button_id = query.data.removeprefix("edit_button_name_")
     context.user_data['editing_button_id'] = button_id
     
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
-    
-    button = next((b for b in config.get('custom_buttons', []) if b['id'] == button_id), None)
+    button = _BUTTON_INDEX.get(button_id)
     
     message = await query.edit_message_text(
         f"✏️ Modification du nom du bouton\n\n"
@@ -907,13 +1344,10 @@ async def start_edit_button_value(update: Update, context: ContextTypes.DEFAULT_
     query = update.callback_query
     await query.answer()
     
-    button_id = query.data.replace("edit_button_value_", "")
+    button_id = query.data.removeprefix("edit_button_value_")
     context.user_data['editing_button_id'] = button_id
     
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
-    
-    button = next((b for b in config.get('custom_buttons', []) if b['id'] == button_id), None)
+    button = _BUTTON_INDEX.get(button_id)
     
     message = await query.edit_message_text(
         f"✏️ Modification de la valeur du bouton\n\n"
@@ -934,61 +1368,51 @@ async def start_edit_button_value(update: Update, context: ContextTypes.DEFAULT_
 async def handle_button_value(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Gère la réception de la valeur du bouton"""
     # Utiliser text_html s'il est disponible, sinon utiliser text normal
-    value = update.message.text_html if hasattr(update.message, 'text_html') else update.message.text
+    value = update.message.text_html or update.message.text
     chat_id = update.effective_chat.id
     
-    # Supprimer le message de l'utilisateur
-    await update.message.delete()
-    
-    # Supprimer tous les messages précédents stockés
+    # Supprimer le message de l'utilisateur et tous les messages précédents stockés
     messages_to_delete = context.user_data.get('messages_to_delete', [])
-    for msg_id in messages_to_delete:
-        try:
-            await context.bot.delete_message(chat_id=chat_id, message_id=msg_id)
-        except Exception as e:
-            print(f"Erreur lors de la suppression du message {msg_id}: {e}")
+    for error in await delete_many(context.bot, chat_id, [update.message.message_id, *messages_to_delete]):
+        logger.warning("Erreur lors de la suppression des messages: %s", error)
     
-    is_url = value.startswith(('http://', 'https://'))
+    is_url = value.startswith(_URL_SCHEMES)
     
-    if 'editing_button_id' in context.user_data:
+    button_id = context.user_data.get('editing_button_id')
+    if button_id is not None:
         # Mode édition
-        button_id = context.user_data['editing_button_id']
-        with open('config/config.json', 'r') as f:
-            config = json.load(f)
+        button = _BUTTON_INDEX.get(button_id)
+        if button is not None:
+            button['value'] = value
+            button['type'] = 'url' if is_url else 'text'
+            button['parse_mode'] = 'HTML' if not is_url else None  # Ajouter le parse_mode HTML si ce n'est pas une URL
         
-        for button in config.get('custom_buttons', []):
-            if button['id'] == button_id:
-                button['value'] = value
-                button['type'] = 'url' if is_url else 'text'
-                button['parse_mode'] = 'HTML' if not is_url else None  # Ajouter le parse_mode HTML si ce n'est pas une URL
-                break
-        
-        with open('config/config.json', 'w') as f:
-            json.dump(config, f, indent=4)
+        await save_config_async()
         
         # Envoyer le message de confirmation
         reply_message = await context.bot.send_message(
             chat_id=chat_id,
             text="✅ Valeur du bouton modifiée avec succès !",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Retour", callback_data="show_custom_buttons")
-            ]])
+            reply_markup=_BACK_TO_CUSTOM_BUTTONS_MARKUP
         )
         
-        # Nettoyer les données utilisateur
-        context.user_data.clear()
+        # Nettoyer les données de l'assistant
+        clear_user_keys(context, BUTTON_WIZARD_KEYS)
         return CHOOSING
     
     # Mode création
     temp_button = context.user_data.get('temp_button', {})
     
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
+    config = CONFIG
     
     if 'custom_buttons' not in config:
         config['custom_buttons'] = []
     
-    button_id = f"button_{len(config['custom_buttons']) + 1}"
+    # Premier ID libre : len()+1 peut déjà exister après une suppression
+    button_number = len(config['custom_buttons']) + 1
+    while f"button_{button_number}" in _BUTTON_INDEX:
+        button_number += 1
+    button_id = f"button_{button_number}"
     new_button = {
         'id': button_id,
         'name': temp_button.get('name', 'Bouton'),
@@ -998,16 +1422,14 @@ async def handle_button_value(update: Update, context: ContextTypes.DEFAULT_TYPE
     }
     
     config['custom_buttons'].append(new_button)
+    _BUTTON_INDEX[button_id] = new_button
     
-    with open('config/config.json', 'w') as f:
-        json.dump(config, f, indent=4)
+    await save_config_async(config)
     
     await context.bot.send_message(
         chat_id=chat_id,
         text="✅ Bouton ajouté avec succès !",
-        reply_markup=InlineKeyboardMarkup([[
-            InlineKeyboardButton("🔙 Retour", callback_data="show_custom_buttons")
-        ]])
+        reply_markup=_BACK_TO_CUSTOM_BUTTONS_MARKUP
     )
     return CHOOSING
 
@@ -1016,16 +1438,13 @@ async def list_buttons_for_deletion(update: Update, context: ContextTypes.DEFAUL
     query = update.callback_query
     await query.answer()
     
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
+    config = CONFIG
     
     buttons = config.get('custom_buttons', [])
     if not buttons:
         await query.edit_message_text(
             "Aucun bouton personnalisé n'existe.",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Retour", callback_data="show_custom_buttons")
-            ]])
+            reply_markup=_BACK_TO_CUSTOM_BUTTONS_MARKUP
         )
         return CHOOSING
     
@@ -1049,21 +1468,17 @@ async def handle_button_deletion(update: Update, context: ContextTypes.DEFAULT_T
     query = update.callback_query
     await query.answer()
     
-    button_id = query.data.replace("delete_button_", "")
-    
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
+    button_id = query.data.removeprefix("delete_button_")
     
-    config['custom_buttons'] = [b for b in config.get('custom_buttons', []) if b['id'] != button_id]
-    
-    with open('config/config.json', 'w') as f:
-        json.dump(config, f, indent=4)
+    # Ne réécrire la configuration que si le bouton existait
+    button = _BUTTON_INDEX.pop(button_id, None)
+    if button is not None:
+        CONFIG['custom_buttons'].remove(button)
+        await save_config_async()
     
     await query.edit_message_text(
         "✅ Bouton supprimé avec succès !",
-        reply_markup=InlineKeyboardMarkup([[
-            InlineKeyboardButton("🔙 Retour", callback_data="show_custom_buttons")
-        ]])
+        reply_markup=_BACK_TO_CUSTOM_BUTTONS_MARKUP
     )
     return CHOOSING
 
@@ -1072,16 +1487,13 @@ async def list_buttons_for_editing(update: Update, context: ContextTypes.DEFAULT
     query = update.callback_query
     await query.answer()
     
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
+    config = CONFIG
     
     buttons = config.get('custom_buttons', [])
     if not buttons:
         await query.edit_message_text(
             "Aucun bouton personnalisé n'existe.",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Retour", callback_data="show_custom_buttons")
-            ]])
+            reply_markup=_BACK_TO_CUSTOM_BUTTONS_MARKUP
         )
         return CHOOSING
     
@@ -1105,13 +1517,10 @@ async def handle_button_editing(update: Update, context: ContextTypes.DEFAULT_TY
     query = update.callback_query
     await query.answer()
     
-    button_id = query.data.replace("edit_button_", "")
+    button_id = query.data.removeprefix("edit_button_")
     context.user_data['editing_button_id'] = button_id
     
-    with open('config/config.json', 'r') as f:
-        config = json.load(f)
-    
-    button = next((b for b in config.get('custom_buttons', []) if b['id'] == button_id), None)
+    button = _BUTTON_INDEX.get(button_id)
     if button:
         keyboard = [
             [InlineKeyboardButton("✏️ Modifier le nom", callback_data=f"edit_button_name_{button_id}")],
@@ -1134,57 +1543,50 @@ async def handle_banner_image(update: Update, context: ContextTypes.DEFAULT_TYPE
         await update.message.reply_text("Veuillez envoyer une photo.")
         return WAITING_BANNER_IMAGE
 
-    # Supprimer le message précédent
-    if 'banner_msg' in context.user_data:
-        await context.bot.delete_message(
-            chat_id=context.user_data['banner_msg'].chat_id,
-            message_id=context.user_data['banner_msg'].message_id
-        )
-        del context.user_data['banner_msg']
+    chat_id = update.effective_chat.id
 
     # Obtenir l'ID du fichier de la photo
     file_id = update.message.photo[-1].file_id
-    CONFIG['banner_image'] = file_id
 
-    # Sauvegarder la configuration
-    with open('config/config.json', 'w', encoding='utf-8') as f:
-        json.dump(CONFIG, f, indent=4)
+    # Supprimer le message contenant l'image et le message précédent
+    message_ids = [update.message.message_id]
+    banner_msg = context.user_data.pop('banner_msg', None)
+    if banner_msg is not None:
+        message_ids.append(banner_msg.message_id)
 
-    # Supprimer le message contenant l'image
-    await update.message.delete()
+    # Même image que la bannière actuelle : rien à sauvegarder ni à renvoyer
+    if file_id == CONFIG.get('banner_image'):
+        await delete_many(context.bot, chat_id, message_ids)
+        return await show_admin_menu(update, context)
+
+    CONFIG['banner_image'] = file_id
 
     thread_id = update.message.message_thread_id if update.message.is_topic_message else None
 
-    # Envoyer le message de confirmation
-    success_msg = await update.message.reply_text(
-        "✅ Image bannière mise à jour avec succès !",
-        message_thread_id=thread_id
+    # Sauvegarder la configuration, supprimer les messages et confirmer en parallèle
+    _, _, success_msg = await asyncio.gather(
+        save_config_async(),
+        delete_many(context.bot, chat_id, message_ids),
+        update.message.reply_text(
+            "✅ Image bannière mise à jour avec succès !",
+            message_thread_id=thread_id
+        )
     )
 
-    # Attendre 3 secondes et supprimer le message
-    await asyncio.sleep(3)
-    await success_msg.delete()
-
-    # Supprimer l'ancienne bannière si elle existe
-    if 'banner_message_id' in context.user_data:
-        try:
-            await context.bot.delete_message(
-                chat_id=update.effective_chat.id,
-                message_id=context.user_data['banner_message_id']
-            )
-        except:
-            pass
+    # Supprimer la confirmation dans 3 secondes, sans bloquer
+    schedule_delete(context, success_msg)
 
-    # Envoyer la nouvelle bannière
-    if CONFIG.get('banner_image'):
-        try:
-            banner_message = await context.bot.send_photo(
-                chat_id=update.effective_chat.id,
-                photo=CONFIG['banner_image']
-            )
-            context.user_data['banner_message_id'] = banner_message.message_id
-        except Exception as e:
-            print(f"Erreur lors de l'envoi de la bannière: {e}")
+    # Supprimer l'ancienne bannière pendant l'envoi de la nouvelle
+    message_ids = [context.user_data.pop('banner_message_id', None)]
+    _, banner_message = await asyncio.gather(
+        delete_many(context.bot, chat_id, message_ids),
+        context.bot.send_photo(chat_id=chat_id, photo=file_id),
+        return_exceptions=True
+    )
+    if isinstance(banner_message, Exception):
+        logger.error("Erreur lors de l'envoi de la bannière", exc_info=banner_message)
+    else:
+        context.user_data['banner_message_id'] = banner_message.message_id
 
     return await show_admin_menu(update, context)
 
@@ -1194,15 +1596,7 @@ async def handle_category_name(update: Update, context: ContextTypes.DEFAULT_TYP
     
     # Fonction pour compter les emojis
     def count_emojis(text):
-        emoji_pattern = re.compile("["
-            u"\U0001F600-\U0001F64F"  # emoticons
-            u"\U0001F300-\U0001F5FF"  # symbols & pictographs
-            u"\U0001F680-\U0001F6FF"  # transport & map symbols
-            u"\U0001F1E0-\U0001F1FF"  # flags (iOS)
-            u"\U00002702-\U000027B0"
-            u"\U000024C2-\U0001F251"
-            "]+", flags=re.UNICODE)
-        return len(emoji_pattern.findall(text))
+        return len(_PATTERNS['emoji'].findall(text))
     
     # Limites
     MAX_LENGTH = 32  # Longueur maximale du nom de catégorie
@@ -1224,62 +1618,45 @@ async def handle_category_name(update: Update, context: ContextTypes.DEFAULT_TYP
         error_message = "❌ Cette catégorie existe déjà."
     
     if error_message:
-        await update.message.reply_text(
+        error_msg = await update.message.reply_text(
             error_message + "\nVeuillez choisir un autre nom:",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_category")
-            ]])
+            reply_markup=_CANCEL_ADD_CATEGORY_MARKUP
         )
+        context.user_data['prev_prompt_id'] = error_msg.message_id
         return WAITING_CATEGORY_NAME
     
     CATALOG[category_name] = []
-    save_catalog(CATALOG)
+    mark_catalog_dirty()
     
-    # Supprimer le message précédent
-    await context.bot.delete_message(
-        chat_id=update.effective_chat.id,
-        message_id=update.message.message_id - 1
-    )
-    
-    # Supprimer le message de l'utilisateur
-    await update.message.delete()
+    # Supprimer la demande précédente et le message de l'utilisateur
+    await delete_prev_prompt(update, context, update.message.message_id)
     
     return await show_admin_menu(update, context)
 
 async def handle_product_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Gère l'entrée du nom du produit"""
     product_name = update.message.text
-    category = context.user_data.get('temp_product_category')
+    wiz = product_wizard(context)
+    category = wiz.get('category')
     
-    # Vérifier si la catégorie contient SOLD OUT et le supprimer
-    if category and CATALOG.get(category):
-        if len(CATALOG[category]) == 1 and CATALOG[category][0].get('name') == 'SOLD OUT ! ❌':
-            CATALOG[category] = []
-            save_catalog(CATALOG)
-
-    if category and any(p.get('name') == product_name for p in CATALOG.get(category, [])):
-        await update.message.reply_text(
+    if category and product_name in CATALOG_INDEX.get(category, {}):
+        error_msg = await update.message.reply_text(
             "❌ Ce produit existe déjà dans cette catégorie. Veuillez choisir un autre nom:",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_product")
-            ]])
+            reply_markup=_CANCEL_ADD_PRODUCT_MARKUP
         )
+        context.user_data['prev_prompt_id'] = error_msg.message_id
         return WAITING_PRODUCT_NAME
     
-    context.user_data['temp_product_name'] = product_name
+    wiz['name'] = product_name
     
-    # Supprimer le message précédent
-    await context.bot.delete_message(
-        chat_id=update.effective_chat.id,
-        message_id=update.message.message_id - 1
-    )
+    # Supprimer la demande précédente
+    await delete_prev_prompt(update, context)
     
-    await update.message.reply_text(
+    prompt = await update.message.reply_text(
         "💰 Veuillez entrer le prix du produit:",
-        reply_markup=InlineKeyboardMarkup([[
-            InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_product")
-        ]])
+        reply_markup=_CANCEL_ADD_PRODUCT_MARKUP
     )
+    context.user_data['prev_prompt_id'] = prompt.message_id
     
     # Supprimer le message de l'utilisateur
     await update.message.delete()
@@ -1289,21 +1666,17 @@ async def handle_product_name(update: Update, context: ContextTypes.DEFAULT_TYPE
 async def handle_product_price(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Gère l'entrée du prix du produit"""
     # Utiliser text_html pour capturer le formatage
-    price = update.message.text_html if hasattr(update.message, 'text_html') else update.message.text
-    context.user_data['temp_product_price'] = price
+    price = update.message.text_html or update.message.text
+    product_wizard(context)['price'] = price
     
-    # Supprimer le message précédent
-    await context.bot.delete_message(
-        chat_id=update.effective_chat.id,
-        message_id=update.message.message_id - 1
-    )
+    # Supprimer la demande précédente
+    await delete_prev_prompt(update, context)
     
-    await update.message.reply_text(
+    prompt = await update.message.reply_text(
         "📝 Veuillez entrer la description du produit:",
-        reply_markup=InlineKeyboardMarkup([[
-            InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_product")
-        ]])
+        reply_markup=_CANCEL_ADD_PRODUCT_MARKUP
     )
+    context.user_data['prev_prompt_id'] = prompt.message_id
     
     # Supprimer le message de l'utilisateur
     await update.message.delete()
@@ -1313,17 +1686,15 @@ async def handle_product_price(update: Update, context: ContextTypes.DEFAULT_TYP
 async def handle_product_description(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Gère l'entrée de la description du produit"""
     # Utiliser text_html pour capturer le formatage
-    description = update.message.text_html if hasattr(update.message, 'text_html') else update.message.text
-    context.user_data['temp_product_description'] = description
+    description = update.message.text_html or update.message.text
+    wiz = product_wizard(context)
+    wiz['description'] = description
     
     # Initialiser la liste des médias
-    context.user_data['temp_product_media'] = []
+    wiz['media'] = []
     
-    # Supprimer le message précédent
-    await context.bot.delete_message(
-        chat_id=update.effective_chat.id,
-        message_id=update.message.message_id - 1
-    )
+    # Supprimer la demande précédente
+    await delete_prev_prompt(update, context)
     
     # Envoyer et sauvegarder l'ID du message d'invitation
     invitation_message = await update.message.reply_text(
@@ -1334,7 +1705,7 @@ async def handle_product_description(update: Update, context: ContextTypes.DEFAU
             [InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_product")]
         ])
     )
-    context.user_data['media_invitation_message_id'] = invitation_message.message_id
+    wiz['invitation_id'] = invitation_message.message_id
     
     # Supprimer le message de l'utilisateur
     await update.message.delete()
@@ -1347,32 +1718,30 @@ async def handle_product_media(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text("Veuillez envoyer une photo ou une vidéo.")
         return WAITING_PRODUCT_MEDIA
 
-    if 'temp_product_media' not in context.user_data:
-        context.user_data['temp_product_media'] = []
+    wiz = product_wizard(context)
+    wiz.setdefault('media', [])
+    wiz.setdefault('media_count', 0)
 
-    if 'media_count' not in context.user_data:
-        context.user_data['media_count'] = 0
-
-    if context.user_data.get('media_invitation_message_id'):
+    if wiz.get('invitation_id'):
         try:
             await context.bot.delete_message(
                 chat_id=update.effective_chat.id,
-                message_id=context.user_data['media_invitation_message_id']
+                message_id=wiz['invitation_id']
             )
-            del context.user_data['media_invitation_message_id']
+            del wiz['invitation_id']
         except Exception as e:
-            print(f"Erreur lors de la suppression du message d'invitation: {e}")
+            logger.warning("Suppression du message d'invitation impossible: %s", e)
 
-    if context.user_data.get('last_confirmation_message_id'):
+    if wiz.get('confirmation_id'):
         try:
             await context.bot.delete_message(
                 chat_id=update.effective_chat.id,
-                message_id=context.user_data['last_confirmation_message_id']
+                message_id=wiz['confirmation_id']
             )
         except Exception as e:
-            print(f"Erreur lors de la suppression du message de confirmation: {e}")
+            logger.warning("Suppression du message de confirmation impossible: %s", e)
 
-    context.user_data['media_count'] += 1
+    wiz['media_count'] += 1
 
     if update.message.photo:
         media_id = update.message.photo[-1].file_id
@@ -1384,21 +1753,21 @@ async def handle_product_media(update: Update, context: ContextTypes.DEFAULT_TYP
     new_media = {
         'media_id': media_id,
         'media_type': media_type,
-        'order_index': context.user_data['media_count']
+        'order_index': wiz['media_count']
     }
 
-    context.user_data['temp_product_media'].append(new_media)
+    wiz['media'].append(new_media)
 
     await update.message.delete()
 
     message = await update.message.reply_text(
-        f"Photo/Vidéo {context.user_data['media_count']} ajoutée ! Cliquez sur Terminé pour valider :",
+        f"Photo/Vidéo {wiz['media_count']} ajoutée ! Cliquez sur Terminé pour valider :",
         reply_markup=InlineKeyboardMarkup([
             [InlineKeyboardButton("✅ Terminé", callback_data="finish_media")],
             [InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_product")]
         ])
     )
-    context.user_data['last_confirmation_message_id'] = message.message_id
+    wiz['confirmation_id'] = message.message_id
 
     return WAITING_PRODUCT_MEDIA
 
@@ -1406,49 +1775,36 @@ async def finish_product_media(update: Update, context: ContextTypes.DEFAULT_TYP
     query = update.callback_query
     await query.answer()
 
-    category = context.user_data.get('temp_product_category')
+    wiz = context.user_data.get('wizard', {})
+    category = wiz.get('category')
     if not category:
         return await show_admin_menu(update, context)
 
     if context.user_data.get('editing_category'):  # Si on est en mode édition
         product_name = context.user_data.get('editing_product')
-        if product_name:
-            for product in CATALOG[category]:
-                if product['name'] == product_name:
-                    product['media'] = context.user_data.get('temp_product_media', [])
-                    save_catalog(CATALOG)
-                    break
+        product = CATALOG_INDEX.get(category, {}).get(product_name)
+        if product is not None:
+            product['media'] = wiz.get('media', [])
+            mark_catalog_dirty()
     else:  # Si on est en mode création
         new_product = {
-            'name': context.user_data.get('temp_product_name'),
-            'price': context.user_data.get('temp_product_price'),
-            'description': context.user_data.get('temp_product_description'),
-            'media': context.user_data.get('temp_product_media', [])
+            'name': wiz.get('name'),
+            'price': wiz.get('price'),
+            'description': wiz.get('description'),
+            'media': wiz.get('media', [])
         }
 
         if category not in CATALOG:
             CATALOG[category] = []
+        # Le SOLD OUT n'est retiré qu'à l'ajout effectif du produit
+        _clear_soldout(category)
         CATALOG[category].append(new_product)
-        save_catalog(CATALOG)
+        mark_catalog_dirty()
 
     # Nettoyer et retourner au menu admin
-    context.user_data.clear()
-    keyboard = [
-        [InlineKeyboardButton("➕ Ajouter une catégorie", callback_data="add_category")],
-        [InlineKeyboardButton("➕ Ajouter un produit", callback_data="add_product")],
-        [InlineKeyboardButton("❌ Supprimer une catégorie", callback_data="delete_category")],
-        [InlineKeyboardButton("❌ Supprimer un produit", callback_data="delete_product")],
-        [InlineKeyboardButton("✏️ Modifier une catégorie", callback_data="edit_category")],
-        [InlineKeyboardButton("✏️ Modifier un produit", callback_data="edit_product")],
-        [InlineKeyboardButton("🎯 Gérer boutons accueil", callback_data="show_custom_buttons")],
-        [InlineKeyboardButton(f"🔒 Code d'accès: {status_text}", callback_data="toggle_access_code")],
-        [InlineKeyboardButton("📊 Statistiques", callback_data="show_stats")],
-        [InlineKeyboardButton("🛒 Modifier bouton Commander", callback_data="edit_order_button")],
-        [InlineKeyboardButton("🏠 Modifier message d'accueil", callback_data="edit_welcome")],  
-        [InlineKeyboardButton("🖼️ Modifier image bannière", callback_data="edit_banner_image")],
-        [InlineKeyboardButton("📢 Gestion annonces", callback_data="manage_broadcasts")],
-        [InlineKeyboardButton("🔙 Retour à l'accueil", callback_data="back_to_home")]
-    ]
+    clear_user_keys(context, PRODUCT_WIZARD_KEYS)
+    is_enabled = access_manager.is_access_code_enabled()
+    keyboard = _ADMIN_MENU_PREFIX + [_ACCESS_CODE_ROWS[bool(is_enabled)]] + _ADMIN_MENU_SUFFIX
 
     try:
         await query.message.delete()
@@ -1474,26 +1830,23 @@ async def handle_new_value(update: Update, context: ContextTypes.DEFAULT_TYPE):
     field = context.user_data.get('editing_field')
     
     # Utiliser text_html pour capturer le formatage
-    new_value = update.message.text_html if hasattr(update.message, 'text_html') else update.message.text
+    new_value = update.message.text_html or update.message.text
 
     if not all([category, product_name, field]):
         await update.message.reply_text("❌ Une erreur est survenue. Veuillez réessayer.")
         return await show_admin_menu(update, context)
 
-    for product in CATALOG.get(category, []):
-        if product['name'] == product_name:
-            old_value = product.get(field, "Non défini")
-            product[field] = new_value
-            save_catalog(CATALOG)
-
-            await context.bot.delete_message(
-                chat_id=update.effective_chat.id,
-                message_id=update.message.message_id - 1
-            )
-            await update.message.delete()
+    product = CATALOG_INDEX.get(category, {}).get(product_name)
+    if product is not None:
+        old_value = product.get(field, "Non défini")
+        product[field] = new_value
+        mark_catalog_dirty()
 
-            keyboard = [[InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")]]
-            await context.bot.send_message(
+        # Suppression des anciens messages et confirmation envoyées en parallèle
+        keyboard = [[InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")]]
+        await asyncio.gather(
+            delete_prev_prompt(update, context, update.message.message_id),
+            context.bot.send_message(
                 chat_id=update.effective_chat.id,
                 text=f"✅ Modification effectuée avec succès !\n\n"
                      f"Ancien {field}: {old_value}\n"
@@ -1501,7 +1854,7 @@ async def handle_new_value(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 reply_markup=InlineKeyboardMarkup(keyboard),
                 parse_mode='HTML'  # Ajout du parse_mode HTML
             )
-            break
+        )
 
     return CHOOSING
 
@@ -1510,10 +1863,7 @@ async def handle_contact_username(update: Update, context: ContextTypes.DEFAULT_
     new_value = update.message.text.strip()
     
     try:
-        # Supprimer le message de l'utilisateur
-        await update.message.delete()
-        
-        if new_value.startswith(('http://', 'https://')):
+        if new_value.startswith(_URL_SCHEMES):
             # C'est une URL
             CONFIG['contact_url'] = new_value
             CONFIG['contact_username'] = None
@@ -1522,18 +1872,19 @@ async def handle_contact_username(update: Update, context: ContextTypes.DEFAULT_
             # C'est un pseudo Telegram
             username = new_value.replace("@", "")
             # Vérifier le format basique d'un username Telegram
-            if not bool(re.match(r'^[a-zA-Z0-9_]{5,32}$', username)):
-                if 'edit_contact_message_id' in context.user_data:
+            if not match('tg_username', username):
+                # Supprimer le message de l'utilisateur
+                await update.message.delete()
+                edit_message_id = context.user_data.get('edit_contact_message_id')
+                if edit_message_id is not None:
                     await context.bot.edit_message_text(
                         chat_id=update.effective_chat.id,
-                        message_id=context.user_data['edit_contact_message_id'],
+                        message_id=edit_message_id,
                         text="❌ Format d'username Telegram invalide.\n"
                              "L'username doit contenir entre 5 et 32 caractères,\n"
                              "uniquement des lettres, chiffres et underscores (_).\n\n"
                              "Veuillez réessayer:",
-                        reply_markup=InlineKeyboardMarkup([[
-                            InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit_contact")
-                        ]])
+                        reply_markup=_CANCEL_EDIT_CONTACT_MARKUP
                     )
                 return WAITING_CONTACT_USERNAME
                 
@@ -1541,839 +1892,762 @@ async def handle_contact_username(update: Update, context: ContextTypes.DEFAULT_
             CONFIG['contact_url'] = None
             config_type = "Pseudo Telegram"
         
-        # Sauvegarder dans config.json
-        with open('config/config.json', 'w', encoding='utf-8') as f:
-            json.dump(CONFIG, f, indent=4)
-        
-        # Supprimer l'ancien message de configuration
-        if 'edit_contact_message_id' in context.user_data:
-            try:
-                await context.bot.delete_message(
-                    chat_id=update.effective_chat.id,
-                    message_id=context.user_data['edit_contact_message_id']
-                )
-            except:
-                pass
+        # Sauvegarde différée de config.json
+        mark_config_dirty()
         
         # Message de confirmation avec le @ ajouté si c'est un pseudo Telegram sans @
         display_value = new_value
         if config_type == "Pseudo Telegram" and not new_value.startswith('@'):
             display_value = f"@{new_value}"
         
-        success_message = await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text=f"✅ Configuration du contact mise à jour avec succès!\n\n"
-                 f"Type: {config_type}\n"
-                 f"Valeur: {display_value}",
-            parse_mode='HTML'
+        # La demande de saisie devient la confirmation, supprimée dans 3 secondes
+        await confirm_in_prompt(
+            context,
+            update.effective_chat.id,
+            update.message.message_id,
+            context.user_data.pop('edit_contact_message_id', None),
+            f"✅ Configuration du contact mise à jour avec succès!\n\n"
+            f"Type: {config_type}\n"
+            f"Valeur: {display_value}"
         )
         
-        # Attendre 3 secondes puis supprimer le message de confirmation
-        await asyncio.sleep(3)
-        try:
-            await success_message.delete()
-        except:
-            pass
-        
         return await show_admin_menu(update, context)
         
-    except Exception as e:
-        print(f"Erreur dans handle_contact_username: {e}")
+    except Exception:
+        logger.exception("Erreur dans handle_contact_username")
         return WAITING_CONTACT_USERNAME
 
 async def handle_welcome_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Gère la modification du message d'accueil"""
     # Utiliser text_html pour capturer le formatage
-    new_message = update.message.text_html if hasattr(update.message, 'text_html') else update.message.text
+    new_message = update.message.text_html or update.message.text
     
     try:
-        # Supprimer le message de l'utilisateur
-        await update.message.delete()
-        
         # Mettre à jour la config
         CONFIG['welcome_message'] = new_message
         
-        # Sauvegarder dans config.json
-        with open('config/config.json', 'w', encoding='utf-8') as f:
-            json.dump(CONFIG, f, indent=4)
-        
-        # Supprimer l'ancien message si possible
-        if 'edit_welcome_message_id' in context.user_data:
-            try:
-                await context.bot.delete_message(
-                    chat_id=update.effective_chat.id,
-                    message_id=context.user_data['edit_welcome_message_id']
-                )
-            except:
-                pass
-        
-        # Message de confirmation
-        success_message = await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text=f"✅ Message d'accueil mis à jour avec succès!\n\n"
-                 f"Nouveau message :\n{new_message}",
-            parse_mode='HTML'
+        # Sauvegarde différée de config.json
+        mark_config_dirty()
+        
+        # La demande de saisie devient la confirmation, supprimée dans 3 secondes
+        await confirm_in_prompt(
+            context,
+            update.effective_chat.id,
+            update.message.message_id,
+            context.user_data.pop('edit_welcome_message_id', None),
+            f"✅ Message d'accueil mis à jour avec succès!\n\n"
+            f"Nouveau message :\n{new_message}"
         )
         
-        # Attendre 3 secondes puis supprimer le message de confirmation
-        await asyncio.sleep(3)
-        try:
-            await success_message.delete()
-        except:
-            pass
-        
         return await show_admin_menu(update, context)
         
-    except Exception as e:
-        print(f"Erreur dans handle_welcome_message: {e}")
+    except Exception:
+        logger.exception("Erreur dans handle_welcome_message")
         return WAITING_WELCOME_MESSAGE
 
-async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Gestion des boutons normaux"""
-    global paris_tz 
+async def _btn_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Ouvre le menu d'administration pour les admins"""
     query = update.callback_query
-    await query.answer()
-    await admin_features.register_user(update.effective_user)
-
+    if update.effective_user.id in ADMIN_IDS:
+        return await show_admin_menu(update, context)
+    else:
+        await query.edit_message_text("❌ Vous n'êtes pas autorisé à accéder au menu d'administration.")
+        return CHOOSING
 
-    if query.data == "admin":
-        if str(update.effective_user.id) in ADMIN_IDS:
-            return await show_admin_menu(update, context)
-        else:
-            await query.edit_message_text("❌ Vous n'êtes pas autorisé à accéder au menu d'administration.")
-            return CHOOSING
+async def _btn_show_info_potato(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Affiche le bouton d'exemple avec texte"""
+    query = update.callback_query
+    text = (
+        "🔒 <b>Ceci est un exemple de bouton avec texte</b>\n\n"
+        "<code>Possible de mettre un id SESSION par exemple.</code>"
+    )
+    keyboard = [[InlineKeyboardButton("🔙 Retour aux réseaux", callback_data="show_networks")]]
+    
+    await query.edit_message_text(
+        text=text,
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode='HTML'
+    )
+    return CHOOSING
 
-    elif query.data == "show_info_potato":
-        text = (
-            "🔒 <b>Ceci est un exemple de bouton avec texte</b>\n\n"
-            "<code>Possible de mettre un id SESSION par exemple.</code>"
-        )
-        keyboard = [[InlineKeyboardButton("🔙 Retour aux réseaux", callback_data="show_networks")]]
-        
+async def _btn_custom_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Affiche le texte d'un bouton personnalisé"""
+    query = update.callback_query
+    button_id = query.data.removeprefix("custom_text_")
+    button = _BUTTON_INDEX.get(button_id)
+    if button:
         await query.edit_message_text(
-            text=text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            button['value'],
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔙 Retour", callback_data="back_to_home")
+            ]]),
             parse_mode='HTML'
         )
-        return CHOOSING
+    return CHOOSING
 
-    elif query.data.startswith("custom_text_"):
-        button_id = query.data.replace("custom_text_", "")
-        with open('config/config.json', 'r') as f:
-            config = json.load(f)
-        
-        button = next((b for b in config.get('custom_buttons', []) if b['id'] == button_id), None)
-        if button:
-            await query.edit_message_text(
-                button['value'],
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour", callback_data="back_to_home")
-                ]]),
-                parse_mode='HTML'
-            )
+async def _btn_show_custom_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Menu de gestion des boutons personnalisés"""
+    query = update.callback_query
+    if update.effective_user.id not in ADMIN_IDS:
+        await query.answer("❌ Vous n'êtes pas autorisé à accéder à cette fonction.")
         return CHOOSING
 
-    elif query.data == "show_custom_buttons":
-        if str(update.effective_user.id) not in ADMIN_IDS:
-            await query.answer("❌ Vous n'êtes pas autorisé à accéder à cette fonction.")
-            return CHOOSING
+    keyboard = [
+        [InlineKeyboardButton("➕ Ajouter un bouton", callback_data="add_custom_button")],
+        [InlineKeyboardButton("❌ Supprimer un bouton", callback_data="list_buttons_delete")],
+        [InlineKeyboardButton("✏️ Modifier un bouton", callback_data="list_buttons_edit")],
+        [InlineKeyboardButton("🔙 Retour", callback_data="admin")]
+    ]
 
-        keyboard = [
-            [InlineKeyboardButton("➕ Ajouter un bouton", callback_data="add_custom_button")],
-            [InlineKeyboardButton("❌ Supprimer un bouton", callback_data="list_buttons_delete")],
-            [InlineKeyboardButton("✏️ Modifier un bouton", callback_data="list_buttons_edit")],
-            [InlineKeyboardButton("🔙 Retour", callback_data="admin")]
-        ]
+    await query.edit_message_text(
+        "🔧 Gestion des boutons personnalisés\n\n"
+        "Choisissez une action :",
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode='HTML'  # Ajout du parse_mode
+    )
+    return CHOOSING
 
-        await query.edit_message_text(
-            "🔧 Gestion des boutons personnalisés\n\n"
-            "Choisissez une action :",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-            parse_mode='HTML'  # Ajout du parse_mode
-        )
+async def _btn_add_custom_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Démarre l'ajout d'un bouton personnalisé"""
+    query = update.callback_query
+    if update.effective_user.id not in ADMIN_IDS:
+        await query.answer("Vous n'êtes pas autorisé à accéder à cette fonction.")
         return CHOOSING
 
-    elif query.data == "add_custom_button":
-        if str(update.effective_user.id) not in ADMIN_IDS:
-            await query.answer("Vous n'êtes pas autorisé à accéder à cette fonction.")
-            return CHOOSING
+    await query.edit_message_text(
+        "Ajout d'un nouveau bouton\n\n"
+        "Envoyez le nom du bouton (exemple: 'Mon Bouton') :",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("Retour", callback_data="show_custom_buttons")
+        ]])
+    )
+    return WAITING_BUTTON_NAME
 
+async def _btn_list_buttons_delete(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Liste les boutons personnalisés à supprimer"""
+    query = update.callback_query
+    if update.effective_user.id not in ADMIN_IDS:
+        await query.answer("Vous n'êtes pas autorisé à accéder à cette fonction.")
+        return CHOOSING
+    
+    buttons = CONFIG.get('custom_buttons', [])
+    if not buttons:
         await query.edit_message_text(
-            "Ajout d'un nouveau bouton\n\n"
-            "Envoyez le nom du bouton (exemple: 'Mon Bouton') :",
+            "Aucun bouton personnalise n'existe.",
             reply_markup=InlineKeyboardMarkup([[
                 InlineKeyboardButton("Retour", callback_data="show_custom_buttons")
             ]])
         )
-        return WAITING_BUTTON_NAME
+        return CHOOSING
+    
+    keyboard = [[InlineKeyboardButton(f"Supprimer {button['name']}", callback_data=f"delete_button_{button['id']}")]
+                for button in buttons]
+    keyboard.append([InlineKeyboardButton("Retour", callback_data="show_custom_buttons")])
+    
+    await query.edit_message_text(
+        "Selectionnez le bouton a supprimer :",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+    return CHOOSING
 
-    elif query.data == "list_buttons_delete":
-        if str(update.effective_user.id) not in ADMIN_IDS:
-            await query.answer("Vous n'êtes pas autorisé à accéder à cette fonction.")
-            return CHOOSING
-        
-        with open('config/config.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        
-        buttons = config.get('custom_buttons', [])
-        if not buttons:
-            await query.edit_message_text(
-                "Aucun bouton personnalise n'existe.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("Retour", callback_data="show_custom_buttons")
-                ]])
-            )
-            return CHOOSING
-        
-        keyboard = []
-        for button in buttons:
-            keyboard.append([InlineKeyboardButton(
-                f"Supprimer {button['name']}", 
-                callback_data=f"delete_button_{button['id']}"
-            )])
-        
-        keyboard.append([InlineKeyboardButton("Retour", callback_data="show_custom_buttons")])
-        
-        await query.edit_message_text(
-            "Selectionnez le bouton a supprimer :",
-            reply_markup=InlineKeyboardMarkup(keyboard)
-        )
+async def _btn_delete_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Supprime un bouton personnalisé"""
+    query = update.callback_query
+    if update.effective_user.id not in ADMIN_IDS:
+        await query.answer("❌ Vous n'êtes pas autorisé à accéder à cette fonction.")
         return CHOOSING
+    
+    button_id = query.data.removeprefix("delete_button_")
+    
+    button = _BUTTON_INDEX.pop(button_id, None)
+    if button is not None:
+        CONFIG['custom_buttons'].remove(button)
+        mark_config_dirty()
+    
+    await query.edit_message_text(
+        "✅ Bouton supprimé avec succès !",
+        reply_markup=_BACK_TO_CUSTOM_BUTTONS_MARKUP
+    )
+    return CHOOSING
 
-    elif query.data.startswith("delete_button_"):
-        if str(update.effective_user.id) not in ADMIN_IDS:
-            await query.answer("❌ Vous n'êtes pas autorisé à accéder à cette fonction.")
-            return CHOOSING
-        
-        button_id = query.data.replace("delete_button_", "")
-        
-        with open('config/config.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        
-        config['custom_buttons'] = [b for b in config.get('custom_buttons', []) if b['id'] != button_id]
-        
-        with open('config/config.json', 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=4)
-        
+async def _btn_list_buttons_edit(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Liste les boutons personnalisés à modifier"""
+    query = update.callback_query
+    if update.effective_user.id not in ADMIN_IDS:
+        await query.answer("❌ Vous n'êtes pas autorisé à accéder à cette fonction.")
+        return CHOOSING
+    
+    buttons = CONFIG.get('custom_buttons', [])
+    if not buttons:
         await query.edit_message_text(
-            "✅ Bouton supprimé avec succès !",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Retour", callback_data="show_custom_buttons")
-            ]])
+            "Aucun bouton personnalisé n'existe.",
+            reply_markup=_BACK_TO_CUSTOM_BUTTONS_MARKUP
         )
         return CHOOSING
+    
+    keyboard = [[InlineKeyboardButton(f"✏️ {button['name']}", callback_data=f"edit_button_{button['id']}")]
+                for button in buttons]
+    keyboard.append([InlineKeyboardButton("🔙 Retour", callback_data="show_custom_buttons")])
+    
+    await query.edit_message_text(
+        "Sélectionnez le bouton à modifier :",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+    return CHOOSING
 
-    elif query.data == "list_buttons_edit":
-        if str(update.effective_user.id) not in ADMIN_IDS:
-            await query.answer("❌ Vous n'êtes pas autorisé à accéder à cette fonction.")
-            return CHOOSING
-        
-        with open('config/config.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        
-        buttons = config.get('custom_buttons', [])
-        if not buttons:
-            await query.edit_message_text(
-                "Aucun bouton personnalisé n'existe.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour", callback_data="show_custom_buttons")
-                ]])
-            )
-            return CHOOSING
-        
-        keyboard = []
-        for button in buttons:
-            keyboard.append([InlineKeyboardButton(
-                f"✏️ {button['name']}", 
-                callback_data=f"edit_button_{button['id']}"
-            )])
-        
-        keyboard.append([InlineKeyboardButton("🔙 Retour", callback_data="show_custom_buttons")])
+async def _btn_edit_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Affiche les actions de modification d'un bouton"""
+    query = update.callback_query
+    if update.effective_user.id not in ADMIN_IDS:
+        await query.answer("❌ Vous n'êtes pas autorisé à accéder à cette fonction.")
+        return CHOOSING
+    
+    button_id = query.data.removeprefix("edit_button_")
+    context.user_data['editing_button_id'] = button_id
+    
+    button = _BUTTON_INDEX.get(button_id)
+    if button:
+        keyboard = [
+            [InlineKeyboardButton("✏️ Modifier le nom", callback_data=f"edit_button_name_{button_id}")],
+            [InlineKeyboardButton("🔗 Modifier la valeur", callback_data=f"edit_button_value_{button_id}")],
+            [InlineKeyboardButton("🔙 Retour", callback_data="list_buttons_edit")]
+        ]
         
         await query.edit_message_text(
-            "Sélectionnez le bouton à modifier :",
+            f"Modification du bouton : {button['name']}\n"
+            f"Type actuel : {button['type']}\n"
+            f"Valeur actuelle : {button['value']}\n\n"
+            "Que souhaitez-vous modifier ?",
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
         return CHOOSING
 
-    elif query.data.startswith("edit_button_"):
-        if str(update.effective_user.id) not in ADMIN_IDS:
-            await query.answer("❌ Vous n'êtes pas autorisé à accéder à cette fonction.")
-            return CHOOSING
-        
-        button_id = query.data.replace("edit_button_", "")
-        context.user_data['editing_button_id'] = button_id
-        
-        with open('config/config.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        
-        button = next((b for b in config.get('custom_buttons', []) if b['id'] == button_id), None)
-        if button:
-            keyboard = [
-                [InlineKeyboardButton("✏️ Modifier le nom", callback_data=f"edit_button_name_{button_id}")],
-                [InlineKeyboardButton("🔗 Modifier la valeur", callback_data=f"edit_button_value_{button_id}")],
-                [InlineKeyboardButton("🔙 Retour", callback_data="list_buttons_edit")]
-            ]
-            
-            await query.edit_message_text(
-                f"Modification du bouton : {button['name']}\n"
-                f"Type actuel : {button['type']}\n"
-                f"Valeur actuelle : {button['value']}\n\n"
-                "Que souhaitez-vous modifier ?",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            return CHOOSING
+async def _btn_edit_button_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Demande le nouveau nom d'un bouton"""
+    query = update.callback_query
+    button_id = query.data.removeprefix("edit_button_name_")
+    context.user_data['editing_button_id'] = button_id
+    context.user_data['editing_button_field'] = 'name'
+    
+    await query.edit_message_text(
+        "✏️ Envoyez le nouveau nom du bouton :",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Annuler", callback_data=f"edit_button_{button_id}")
+        ]])
+    )
+    return WAITING_BUTTON_NAME
 
-    elif query.data.startswith("edit_button_name_"):
-        button_id = query.data.replace("edit_button_name_", "")
-        context.user_data['editing_button_id'] = button_id
-        context.user_data['editing_button_field'] = 'name'
-        
-        await query.edit_message_text(
-            "✏️ Envoyez le nouveau nom du bouton :",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Annuler", callback_data=f"edit_button_{button_id}")
-            ]])
+async def _btn_edit_button_value(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Demande la nouvelle valeur d'un bouton"""
+    query = update.callback_query
+    button_id = query.data.removeprefix("edit_button_value_")
+    context.user_data['editing_button_id'] = button_id
+    context.user_data['editing_button_field'] = 'value'
+    
+    await query.edit_message_text(
+        "✏️ Envoyez la nouvelle valeur du bouton :\n\n"
+        "• Pour un bouton URL : envoyez un lien commençant par http:// ou https://\n"
+        "• Pour un bouton texte : envoyez le texte à afficher",
+        reply_markup=InlineKeyboardMarkup([[
+            InlineKeyboardButton("🔙 Annuler", callback_data=f"edit_button_{button_id}")
+        ]])
+    )
+    return WAITING_BUTTON_VALUE
+
+async def _btn_delete_product(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Liste les catégories pour choisir le produit à supprimer"""
+    query = update.callback_query
+    try:
+        # Un callback_data sécurisé et enregistré pour chaque catégorie
+        keyboard = [[safe_callback_button("del_prod_cat", category, category)]
+                    for category in CATALOG_CATEGORIES]
+        keyboard.append([
+            InlineKeyboardButton("🔙 Annuler", callback_data="cancel_delete_product")
+        ])
+
+        await query.message.edit_text(
+            "⚠️ Sélectionnez la catégorie du produit à supprimer:",
+            reply_markup=InlineKeyboardMarkup(keyboard)
         )
-        return WAITING_BUTTON_NAME
+        return SELECTING_CATEGORY_TO_DELETE
+    except Exception:
+        logger.exception("Erreur dans delete_product")
+        await query.message.edit_text(
+            "Une erreur s'est produite. Veuillez réessayer.",
+            reply_markup=_BACK_TO_ADMIN_MARKUP
+        )
+        return CHOOSING
 
-    elif query.data.startswith("edit_button_value_"):
-        button_id = query.data.replace("edit_button_value_", "")
-        context.user_data['editing_button_id'] = button_id
-        context.user_data['editing_button_field'] = 'value'
-        
-        await query.edit_message_text(
-            "✏️ Envoyez la nouvelle valeur du bouton :\n\n"
-            "• Pour un bouton URL : envoyez un lien commençant par http:// ou https://\n"
-            "• Pour un bouton texte : envoyez le texte à afficher",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Annuler", callback_data=f"edit_button_{button_id}")
-            ]])
+async def _btn_del_prod_cat(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Liste les produits d'une catégorie à supprimer"""
+    query = update.callback_query
+    try:
+        # Récupérer la catégorie originale
+        category = get_original_data(query.data)
+        if not category:
+            raise ValueError("Catégorie non trouvée")
+
+        products = CATALOG.get(category, [])
+        # Un callback_data sécurisé et enregistré pour chaque produit
+        keyboard = [[safe_callback_button("confirm_del_prod", f"{category}|||{product['name']}", product['name'])]
+                    for product in products if isinstance(product, dict)]
+        keyboard.append([
+            InlineKeyboardButton("🔙 Annuler", callback_data="cancel_delete_product")
+        ])
+
+        await query.message.edit_text(
+            f"⚠️ Sélectionnez le produit à supprimer de *{category}* :",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode='Markdown'
         )
-        return WAITING_BUTTON_VALUE
+        return SELECTING_PRODUCT_TO_DELETE
+    except Exception:
+        logger.exception("Erreur dans delete_product_category")
+        await query.message.edit_text(
+            "Une erreur s'est produite. Veuillez réessayer.",
+            reply_markup=_BACK_TO_ADMIN_MARKUP
+        )
+        return CHOOSING
 
-    elif query.data == "edit_banner_image":
-            msg = await query.message.edit_text(
-                "📸 Veuillez envoyer la nouvelle image bannière :",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")
-                ]])
+async def _btn_confirm_del_prod(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Demande confirmation avant de supprimer un produit"""
+    query = update.callback_query
+    try:
+        # Récupérer les données originales
+        data = get_original_data(query.data)
+        if not data:
+            raise ValueError("Données non trouvées")
+
+        category, product_name = data.split("|||")
+
+        # Créer un nouveau callback sécurisé pour la confirmation finale
+        safe_callback = create_safe_callback_data(
+            "really_del_prod",
+            f"{category}|||{product_name}"
+        )
+        store_callback_mapping(safe_callback, data)
+
+        keyboard = [[
+            InlineKeyboardButton(
+                "✅ Oui, supprimer",
+                callback_data=safe_callback
+            ),
+            InlineKeyboardButton(
+                "❌ Non, annuler",
+                callback_data="cancel_delete_product"
             )
-            context.user_data['banner_msg'] = msg
-            return WAITING_BANNER_IMAGE
+        ]]
 
-    elif query.data == "manage_users":
-        return await admin_features.handle_user_management(update, context)
+        await query.message.edit_text(
+            f"⚠️ *Êtes-vous sûr de vouloir supprimer le produit* `{product_name}` *?*\n\n"
+            f"Cette action est irréversible !",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode='Markdown'
+        )
+        return SELECTING_PRODUCT_TO_DELETE
+    except Exception:
+        logger.exception("Erreur lors de la confirmation de suppression")
+        await query.message.edit_text(
+            "Une erreur s'est produite. Veuillez réessayer.",
+            reply_markup=_BACK_TO_ADMIN_MARKUP
+        )
+        return CHOOSING
 
-    elif query.data == "start_broadcast":
-        return await admin_features.handle_broadcast(update, context)
+async def _btn_really_del_prod(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Supprime le produit confirmé"""
+    query = update.callback_query
+    try:
+        # Récupérer les données originales
+        data = get_original_data(query.data)
+        if not data:
+            raise ValueError("Données non trouvées")
 
-    elif query.data == "add_category":
+        category, product_name = data.split("|||")
+
+        product = CATALOG_INDEX.get(category, {}).get(product_name)
+        if product is not None:
+            CATALOG[category].remove(product)
+            mark_catalog_dirty()
+
+            # Nettoyer le mapping
+            CALLBACK_DATA_MAPPING.pop(query.data, None)
+
+            await query.message.edit_text(
+                f"✅ Le produit *{product_name}* a été supprimé avec succès !",
+                parse_mode='Markdown',
+                reply_markup=_BACK_TO_ADMIN_MARKUP
+            )
+        else:
+            raise ValueError("Produit non trouvé")
+
+        return CHOOSING
+    except Exception:
+        logger.exception("Erreur lors de la suppression du produit")
         await query.message.edit_text(
-            "📝 Veuillez entrer le nom de la nouvelle catégorie:",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_category")
-            ]])
+            "Une erreur s'est produite lors de la suppression. Veuillez réessayer.",
+            reply_markup=_BACK_TO_ADMIN_MARKUP
         )
-        return WAITING_CATEGORY_NAME
+        return CHOOSING
+
+async def _btn_delete_category(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Liste les catégories à supprimer"""
+    query = update.callback_query
+    try:
+        # Un callback_data sécurisé et enregistré pour chaque catégorie
+        keyboard = [[safe_callback_button("del_cat", category, category)]
+                    for category in CATALOG_CATEGORIES]
+
+        keyboard.append([
+            InlineKeyboardButton("🔙 Annuler", callback_data="cancel_delete_category")
+        ])
 
-    elif query.data == "add_product":
-        keyboard = []
-        for category in CATALOG.keys():
-            if category != 'stats':
-                keyboard.append([InlineKeyboardButton(category, callback_data=f"select_category_{category}")])
-        keyboard.append([InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_product")])
-        
         await query.message.edit_text(
-            "📝 Sélectionnez la catégorie pour le nouveau produit:",
+            "⚠️ Sélectionnez la catégorie à supprimer:",
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
-        return SELECTING_CATEGORY
+        return SELECTING_CATEGORY_TO_DELETE
 
-    elif query.data.startswith("select_category_"):
-        # Ne traiter que si ce n'est PAS une action de suppression
-        if not query.data.startswith("select_category_to_delete_"):
-            category = query.data.replace("select_category_", "")
-            context.user_data['temp_product_category'] = category
-            
-            await query.message.edit_text(
-                "📝 Veuillez entrer le nom du nouveau produit:",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_product")
-                ]])
-            )
-            return WAITING_PRODUCT_NAME
+    except Exception:
+        logger.exception("Erreur dans delete_category")
+        await query.message.edit_text(
+            "Une erreur s'est produite. Veuillez réessayer.",
+            reply_markup=_BACK_TO_ADMIN_MARKUP
+        )
+        return CHOOSING
 
-    elif query.data == "delete_product":
-        try:
-            keyboard = []
-            for category in CATALOG.keys():
-                if category != 'stats':
-                    # Créer un callback_data sécurisé pour chaque catégorie
-                    safe_callback = create_safe_callback_data(
-                        "del_prod_cat",
-                        category
-                    )
-                    # Stocker la correspondance
-                    store_callback_mapping(safe_callback, category)
-                    
-                    keyboard.append([
-                        InlineKeyboardButton(
-                            category[:50],  # Limite l'affichage à 50 caractères
-                            callback_data=safe_callback
-                        )
-                    ])
-            keyboard.append([
-                InlineKeyboardButton("🔙 Annuler", callback_data="cancel_delete_product")
-            ])
-            
-            await query.message.edit_text(
-                "⚠️ Sélectionnez la catégorie du produit à supprimer:",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            return SELECTING_CATEGORY_TO_DELETE
-        except Exception as e:
-            print(f"Erreur dans delete_product: {e}")
-            await query.message.edit_text(
-                "Une erreur s'est produite. Veuillez réessayer.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                ]])
+async def _btn_del_cat(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Demande confirmation avant de supprimer une catégorie"""
+    query = update.callback_query
+    try:
+        # Récupérer la catégorie originale à partir du mapping
+        original_category = get_original_data(query.data)
+        if not original_category:
+            raise ValueError("Catégorie non trouvée")
+
+        # Créer un nouveau callback sécurisé pour la confirmation
+        confirm_callback = create_safe_callback_data(
+            "confirm_del",
+            original_category
+        )
+        store_callback_mapping(confirm_callback, original_category)
+
+        keyboard = [[
+            InlineKeyboardButton(
+                "✅ Oui, supprimer",
+                callback_data=confirm_callback
+            ),
+            InlineKeyboardButton(
+                "❌ Non, annuler",
+                callback_data="cancel_delete_category"
             )
-            return CHOOSING
+        ]]
 
-    elif query.data.startswith("del_prod_cat_"):
-        try:
-            # Récupérer la catégorie originale
-            category = get_original_data(query.data)
-            if not category:
-                raise ValueError("Catégorie non trouvée")
-                
-            products = CATALOG.get(category, [])
-            keyboard = []
-            
-            for product in products:
-                if isinstance(product, dict):
-                    # Créer un callback_data sécurisé pour chaque produit
-                    product_data = f"{category}|||{product['name']}"
-                    safe_callback = create_safe_callback_data(
-                        "confirm_del_prod",
-                        product_data
-                    )
-                    # Stocker la correspondance
-                    store_callback_mapping(safe_callback, product_data)
-                    
-                    keyboard.append([
-                        InlineKeyboardButton(
-                            product['name'][:50],  # Limite l'affichage à 50 caractères
-                            callback_data=safe_callback
-                        )
-                    ])
-                    
-            keyboard.append([
-                InlineKeyboardButton("🔙 Annuler", callback_data="cancel_delete_product")
-            ])
+        await query.message.edit_text(
+            f"⚠️ *Êtes-vous sûr de vouloir supprimer la catégorie* `{original_category}` *?*\n\n"
+            f"Cette action supprimera également tous les produits de cette catégorie.\n"
+            f"Cette action est irréversible !",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode='Markdown'
+        )
+        return SELECTING_CATEGORY_TO_DELETE
 
-            await query.message.edit_text(
-                f"⚠️ Sélectionnez le produit à supprimer de *{category}* :",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='Markdown'
-            )
-            return SELECTING_PRODUCT_TO_DELETE
-        except Exception as e:
-            print(f"Erreur dans delete_product_category: {e}")
-            await query.message.edit_text(
-                "Une erreur s'est produite. Veuillez réessayer.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                ]])
-            )
-            return CHOOSING
+    except Exception:
+        logger.exception("Erreur dans la confirmation de suppression")
+        await query.message.edit_text(
+            "Une erreur s'est produite. Veuillez réessayer.",
+            reply_markup=_BACK_TO_ADMIN_MARKUP
+        )
+        return CHOOSING
 
-    elif query.data.startswith("confirm_del_prod_"):
-        try:
-            # Récupérer les données originales
-            data = get_original_data(query.data)
-            if not data:
-                raise ValueError("Données non trouvées")
-                
-            category, product_name = data.split("|||")
-            
-            # Créer un nouveau callback sécurisé pour la confirmation finale
-            safe_callback = create_safe_callback_data(
-                "really_del_prod",
-                f"{category}|||{product_name}"
-            )
-            store_callback_mapping(safe_callback, data)
-            
-            keyboard = [[
-                InlineKeyboardButton(
-                    "✅ Oui, supprimer",
-                    callback_data=safe_callback
-                ),
-                InlineKeyboardButton(
-                    "❌ Non, annuler",
-                    callback_data="cancel_delete_product"
-                )
-            ]]
-            
-            await query.message.edit_text(
-                f"⚠️ *Êtes-vous sûr de vouloir supprimer le produit* `{product_name}` *?*\n\n"
-                f"Cette action est irréversible !",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='Markdown'
-            )
-            return SELECTING_PRODUCT_TO_DELETE
-        except Exception as e:
-            print(f"Erreur lors de la confirmation de suppression: {e}")
-            await query.message.edit_text(
-                "Une erreur s'est produite. Veuillez réessayer.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                ]])
-            )
-            return CHOOSING
+async def _btn_confirm_del_cat(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Supprime la catégorie confirmée"""
+    query = update.callback_query
+    try:
+        # Récupérer la catégorie originale
+        original_category = get_original_data(query.data)
+        if not original_category or original_category not in CATALOG:
+            raise ValueError("Catégorie invalide ou non trouvée")
+
+        # Supprimer la catégorie
+        del CATALOG[original_category]
+        mark_catalog_dirty()
+
+        # Nettoyer le mapping
+        CALLBACK_DATA_MAPPING.pop(query.data, None)
+
+        await query.message.edit_text(
+            f"✅ La catégorie a été supprimée avec succès !",
+            reply_markup=_BACK_TO_ADMIN_MARKUP
+        )
+        return CHOOSING
+
+    except Exception:
+        logger.exception("Erreur lors de la suppression")
+        await query.message.edit_text(
+            "Une erreur s'est produite lors de la suppression. Veuillez réessayer.",
+            reply_markup=_BACK_TO_ADMIN_MARKUP
+        )
+        return CHOOSING
+
+def build_edit_category_keyboard():
+    """Clavier de choix de la catégorie à modifier, partagé par edit_category et confirm_soldout_"""
+    keyboard = [[InlineKeyboardButton(
+        f"{category} {'(SOLD OUT ❌)' if category in UNAVAILABLE_CATEGORIES else ''}",
+        callback_data=f"edit_cat_{category}"
+    )] for category in CATALOG_CATEGORIES]
+    keyboard.append([InlineKeyboardButton("🔙 Retour", callback_data="admin")])
+    return InlineKeyboardMarkup(keyboard)
+
+async def _btn_edit_category(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Liste les catégories à modifier"""
+    query = update.callback_query
+    if query.from_user.id in ADMIN_IDS:
+        await query.message.edit_text(
+            "Choisissez une catégorie à modifier:",
+            reply_markup=build_edit_category_keyboard()
+        )
+        return CHOOSING
+
+async def _btn_edit_cat_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Demande le nouveau nom d'une catégorie"""
+    query = update.callback_query
+    if query.from_user.id in ADMIN_IDS:
+        category = query.data.removeprefix("edit_cat_name_")
+        context.user_data['category_to_edit'] = category
+        await query.message.edit_text(
+            f"📝 *Modification du nom de catégorie*\n\n"
+            f"Catégorie actuelle : *{category}*\n\n"
+            f"✍️ Envoyez le nouveau nom pour cette catégorie :",
+            reply_markup=InlineKeyboardMarkup([[
+                InlineKeyboardButton("🔙 Retour", callback_data=f"edit_cat_{category}")
+            ]]),
+            parse_mode='Markdown'
+        )
+        context.user_data['category_prompt_msg_id'] = query.message.message_id
+        return WAITING_NEW_CATEGORY_NAME
+
+async def _btn_edit_cat(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Menu de modification d'une catégorie"""
+    query = update.callback_query
+    if query.from_user.id in ADMIN_IDS:
+        category = query.data.removeprefix("edit_cat_")
+        keyboard = [
+            [InlineKeyboardButton("✏️ Modifier le nom", callback_data=f"edit_cat_name_{category}")],
+            [InlineKeyboardButton("➕ Ajouter SOLD OUT", callback_data=f"add_soldout_{category}")],
+            [InlineKeyboardButton("🔙 Retour", callback_data="edit_category")]
+        ]
+        await query.message.edit_text(
+            f"Que voulez-vous modifier pour la catégorie *{category}* ?",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode='Markdown'
+        )
+        return CHOOSING
+
+async def _btn_add_soldout(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Demande confirmation avant de passer une catégorie en SOLD OUT"""
+    query = update.callback_query
+    if query.from_user.id in ADMIN_IDS:
+        category = query.data.removeprefix("add_soldout_")
+        # Demander confirmation avant d'ajouter SOLD OUT
+        keyboard = [
+            [
+                InlineKeyboardButton("✅ Oui, mettre en SOLD OUT", callback_data=f"confirm_soldout_{category}"),
+                InlineKeyboardButton("❌ Non, annuler", callback_data=f"edit_cat_{category}")
+            ]
+        ]
+        await query.message.edit_text(
+            f"⚠️ *Attention!*\n\n"
+            f"Vous êtes sur le point de mettre la catégorie *{category}* en SOLD OUT.\n\n"
+            f"❗ *Cela supprimera tous les produits existants* dans cette catégorie.\n\n"
+            f"Êtes-vous sûr de vouloir continuer?",
+            reply_markup=InlineKeyboardMarkup(keyboard),
+            parse_mode='Markdown'
+        )
+        return EDITING_CATEGORY
 
-    elif query.data.startswith("really_del_prod_"):
-        try:
-            # Récupérer les données originales
-            data = get_original_data(query.data)
-            if not data:
-                raise ValueError("Données non trouvées")
-                
-            category, product_name = data.split("|||")
-            
-            if category in CATALOG:
-                CATALOG[category] = [p for p in CATALOG[category] if p['name'] != product_name]
-                save_catalog(CATALOG)
-                
-                # Nettoyer le mapping
-                CALLBACK_DATA_MAPPING.pop(query.data, None)
-                
-                await query.message.edit_text(
-                    f"✅ Le produit *{product_name}* a été supprimé avec succès !",
-                    parse_mode='Markdown',
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                    ]])
-                )
-            else:
-                raise ValueError("Catégorie non trouvée")
-                
-            return CHOOSING
-        except Exception as e:
-            print(f"Erreur lors de la suppression du produit: {e}")
-            await query.message.edit_text(
-                "Une erreur s'est produite lors de la suppression. Veuillez réessayer.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                ]])
-            )
-            return CHOOSING
+async def _btn_confirm_soldout(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Passe la catégorie en SOLD OUT"""
+    query = update.callback_query
+    if query.from_user.id in ADMIN_IDS:
+        category = query.data.removeprefix("confirm_soldout_")
+        # Vider la catégorie et ajouter le produit SOLD OUT
+        CATALOG[category] = [{
+            'name': 'SOLD OUT ! ❌',
+            'price': 'Non disponible',
+            'description': 'Cette catégorie est temporairement en rupture de stock.',
+            'media': []
+        }]
+        mark_catalog_dirty()
+        await query.answer("✅ SOLD OUT ajouté avec succès!")
+
+        # Retourner au menu d'édition des catégories
+        await query.message.edit_text(
+            "Choisissez une catégorie à modifier:",
+            reply_markup=build_edit_category_keyboard()
+        )
+        return EDITING_CATEGORY
 
-    elif query.data == "delete_category":
-        try:
-            keyboard = []
-            for category in CATALOG.keys():
-                if category != 'stats':
-                    # Créer un callback_data sécurisé pour chaque catégorie
-                    safe_callback = create_safe_callback_data(
-                        "del_cat",
-                        category
-                    )
-                    # Stocker la correspondance
-                    store_callback_mapping(safe_callback, category)
-                    
-                    keyboard.append([
-                        InlineKeyboardButton(
-                            category[:50],  # Limite l'affichage à 50 caractères
-                            callback_data=safe_callback
-                        )
-                    ])
-            
-            keyboard.append([
-                InlineKeyboardButton("🔙 Annuler", callback_data="cancel_delete_category")
-            ])
-            
-            await query.message.edit_text(
-                "⚠️ Sélectionnez la catégorie à supprimer:",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            return SELECTING_CATEGORY_TO_DELETE
-            
-        except Exception as e:
-            print(f"Erreur dans delete_category: {e}")
-            await query.message.edit_text(
-                "Une erreur s'est produite. Veuillez réessayer.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                ]])
-            )
-            return CHOOSING
+async def _btn_toggle_access_code(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Active ou désactive le système de code d'accès"""
+    query = update.callback_query
+    if update.effective_user.id not in ADMIN_IDS:
+        await query.answer("❌ Vous n'êtes pas autorisé à modifier ce paramètre.")
+        return CHOOSING
 
-    elif query.data.startswith("del_cat_"):
-        try:
-            # Récupérer la catégorie originale à partir du mapping
-            original_category = get_original_data(query.data)
-            if not original_category:
-                raise ValueError("Catégorie non trouvée")
-                
-            # Créer un nouveau callback sécurisé pour la confirmation
-            confirm_callback = create_safe_callback_data(
-                "confirm_del",
-                original_category
-            )
-            store_callback_mapping(confirm_callback, original_category)
-            
-            keyboard = [[
-                InlineKeyboardButton(
-                    "✅ Oui, supprimer",
-                    callback_data=confirm_callback
-                ),
-                InlineKeyboardButton(
-                    "❌ Non, annuler",
-                    callback_data="cancel_delete_category"
-                )
-            ]]
-            
-            await query.message.edit_text(
-                f"⚠️ *Êtes-vous sûr de vouloir supprimer la catégorie* `{original_category}` *?*\n\n"
-                f"Cette action supprimera également tous les produits de cette catégorie.\n"
-                f"Cette action est irréversible !",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='Markdown'
-            )
-            return SELECTING_CATEGORY_TO_DELETE
-            
-        except Exception as e:
-            print(f"Erreur dans la confirmation de suppression: {e}")
-            await query.message.edit_text(
-                "Une erreur s'est produite. Veuillez réessayer.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                ]])
-            )
-            return CHOOSING
+    is_enabled = access_manager.toggle_access_code()
+    status = "activé ✅" if is_enabled else "désactivé ❌"
 
-    elif query.data.startswith("confirm_del_"):
-        try:
-            # Récupérer la catégorie originale
-            original_category = get_original_data(query.data)
-            if not original_category or original_category not in CATALOG:
-                raise ValueError("Catégorie invalide ou non trouvée")
-                
-            # Supprimer la catégorie
-            del CATALOG[original_category]
-            save_catalog(CATALOG)
-            
-            # Nettoyer le mapping
-            CALLBACK_DATA_MAPPING.pop(query.data, None)
-            
-            await query.message.edit_text(
-                f"✅ La catégorie a été supprimée avec succès !",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                ]])
-            )
-            return CHOOSING
-            
-        except Exception as e:
-            print(f"Erreur lors de la suppression: {e}")
-            await query.message.edit_text(
-                "Une erreur s'est produite lors de la suppression. Veuillez réessayer.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                ]])
-            )
-            return CHOOSING
+    # Afficher un message temporaire
+    await query.answer(f"Le système de code d'accès a été {status}")
 
+    # Rafraîchir le menu admin
+    return await show_admin_menu(update, context)
 
-        try:
-            encoded_data = query.data.replace("really_delete_product_", "")
-            category, product_name = decode_callback_data(encoded_data)
-        
-            if category and product_name and category in CATALOG:
-                CATALOG[category] = [p for p in CATALOG[category] if p['name'] != product_name]
-                save_catalog(CATALOG)
-                await query.message.edit_text(
-                    f"✅ Le produit *{html.escape(product_name)}* a été supprimé avec succès !",
-                    parse_mode='Markdown',
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")
-                    ]])
-                )
-            return CHOOSING
-        except Exception as e:
-            print(f"Erreur lors de la suppression du produit: {e}")
-            return await show_admin_menu(update, context)
+async def _btn_edit_order_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Demande la nouvelle configuration du bouton Commander"""
+    query = update.callback_query
+    # Gérer l'affichage des configurations actuelles
+    if CONFIG.get('order_url'):
+        current_config = CONFIG['order_url']
+        config_type = "URL"
+    elif CONFIG.get('order_text'):
+        current_config = CONFIG['order_text']
+        config_type = "Texte"
+    else:
+        current_config = 'Non configuré'
+        config_type = "Aucune"
+
+    message = await query.message.edit_text(
+        "🛒 Configuration du bouton Commander 🛒\n\n"
+        f"<b>Configuration actuelle</b> ({config_type}):\n"
+        f"{current_config}\n\n"
+        "Vous pouvez :\n"
+        "• Envoyer un pseudo Telegram (avec ou sans @)\n\n"
+        "• Envoyer un message avec formatage HTML (<b>gras</b>, <i>italique</i>, etc)\n\n"
+        "• Envoyer une URL (commençant par http:// ou https://) pour rediriger vers un site",
+        reply_markup=_CANCEL_EDIT_ORDER_MARKUP,
+        parse_mode='HTML'  # Ajout du support HTML
+    )
+    context.user_data['edit_order_button_message_id'] = message.message_id
+    return WAITING_ORDER_BUTTON_CONFIG
+
+# Callbacks de handle_normal_buttons traités par une fonction dédiée : d'abord une
+# recherche directe sur query.data, puis par préfixe (les plus longs d'abord,
+# ex. confirm_del_prod_ avant confirm_del_)
+_CALLBACK_HANDLERS = {
+    "admin": _btn_admin,
+    "show_info_potato": _btn_show_info_potato,
+    "show_custom_buttons": _btn_show_custom_buttons,
+    "add_custom_button": _btn_add_custom_button,
+    "list_buttons_delete": _btn_list_buttons_delete,
+    "list_buttons_edit": _btn_list_buttons_edit,
+    "delete_product": _btn_delete_product,
+    "delete_category": _btn_delete_category,
+    "edit_category": _btn_edit_category,
+    "toggle_access_code": _btn_toggle_access_code,
+    "edit_order_button": _btn_edit_order_button,
+}
+_CALLBACK_PREFIX_HANDLERS = {
+    "custom_text_": _btn_custom_text,
+    "delete_button_": _btn_delete_button,
+    "edit_button_name_": _btn_edit_button_name,
+    "edit_button_value_": _btn_edit_button_value,
+    "edit_button_": _btn_edit_button,
+    "del_prod_cat_": _btn_del_prod_cat,
+    "confirm_del_prod_": _btn_confirm_del_prod,
+    "really_del_prod_": _btn_really_del_prod,
+    "del_cat_": _btn_del_cat,
+    "confirm_del_": _btn_confirm_del_cat,
+    "edit_cat_name_": _btn_edit_cat_name,
+    "edit_cat_": _btn_edit_cat,
+    "add_soldout_": _btn_add_soldout,
+    "confirm_soldout_": _btn_confirm_soldout,
+}
+# Une seule alternative compilée teste tous les préfixes, dans l'ordre du dict
+_CALLBACK_PREFIX_RE = re.compile('|'.join(re.escape(prefix) for prefix in _CALLBACK_PREFIX_HANDLERS))
+
+def find_callback_handler(data):
+    """Renvoie la fonction qui traite `data`, ou None si le callback reste dans handle_normal_buttons"""
+    handler = _CALLBACK_HANDLERS.get(data)
+    if handler is None:
+        m = _CALLBACK_PREFIX_RE.match(data)
+        if m:
+            handler = _CALLBACK_PREFIX_HANDLERS[m.group(0)]
+    return handler
 
-    elif query.data == "edit_category":
-        if str(query.from_user.id) in ADMIN_IDS:
-            keyboard = []
-            for category in CATALOG.keys():
-                keyboard.append([InlineKeyboardButton(
-                    f"{category} {'(SOLD OUT ❌)' if not CATALOG[category] else ''}",
-                    callback_data=f"edit_cat_{category}"
-                )])
-            keyboard.append([InlineKeyboardButton("🔙 Retour", callback_data="admin")])
-            await query.message.edit_text(
-                "Choisissez une catégorie à modifier:",
-                reply_markup=InlineKeyboardMarkup(keyboard)
+async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Gestion des boutons normaux"""
+    global paris_tz 
+    query = update.callback_query
+    await query.answer()
+    await admin_features.register_user(update.effective_user)
+
+    # Les callbacks des tables _CALLBACK_HANDLERS / _CALLBACK_PREFIX_HANDLERS passent en premier.
+    # La chaîne ci-dessous garde volontairement le parcours client du catalogue (show_categories,
+    # view_, product_, next_/prev_, back_to_*, show_order_text), l'édition de produit (edit_product,
+    # editcat_, editp_, edit_name/price/desc/media, skip_media) et les écrans d'administration pas
+    # encore extraits. Aucun de ces callbacks ne commence par un préfixe des tables, l'ordre
+    # entre les deux mécanismes n'a donc pas d'effet ; tout nouveau préfixe doit le préserver.
+    handler = find_callback_handler(query.data)
+    if handler is not None:
+        return await handler(update, context)
+
+    if query.data == "edit_banner_image":
+            msg = await query.message.edit_text(
+                "📸 Veuillez envoyer la nouvelle image bannière :",
+                reply_markup=_CANCEL_EDIT_MARKUP
             )
-            return CHOOSING
+            context.user_data['banner_msg'] = msg
+            return WAITING_BANNER_IMAGE
 
-    elif query.data.startswith("edit_cat_"):
-        if str(query.from_user.id) in ADMIN_IDS:
-            if query.data.startswith("edit_cat_name_"):
-                # Gestion de la modification du nom
-                category = query.data.replace("edit_cat_name_", "")
-                context.user_data['category_to_edit'] = category
-                await query.message.edit_text(
-                    f"📝 *Modification du nom de catégorie*\n\n"
-                    f"Catégorie actuelle : *{category}*\n\n"
-                    f"✍️ Envoyez le nouveau nom pour cette catégorie :",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Retour", callback_data=f"edit_cat_{category}")
-                    ]]),
-                    parse_mode='Markdown'
-                )
-                return WAITING_NEW_CATEGORY_NAME
-            else:
-                # Menu d'édition de catégorie
-                category = query.data.replace("edit_cat_", "")
-                keyboard = [
-                    [InlineKeyboardButton("✏️ Modifier le nom", callback_data=f"edit_cat_name_{category}")],
-                    [InlineKeyboardButton("➕ Ajouter SOLD OUT", callback_data=f"add_soldout_{category}")],
-                    [InlineKeyboardButton("🔙 Retour", callback_data="edit_category")]
-                ]
-                await query.message.edit_text(
-                    f"Que voulez-vous modifier pour la catégorie *{category}* ?",
-                    reply_markup=InlineKeyboardMarkup(keyboard),
-                    parse_mode='Markdown'
-                )
-                return CHOOSING
+    elif query.data == "manage_users":
+        return await admin_features.handle_user_management(update, context)
 
-    elif query.data.startswith("edit_cat_name_"):
-        if str(query.from_user.id) in ADMIN_IDS:
-            category = query.data.replace("edit_cat_name_", "")
-            context.user_data['category_to_edit'] = category
-            await query.message.edit_text(
-                f"📝 *Modification du nom de catégorie*\n\n"
-                f"Catégorie actuelle : *{category}*\n\n"
-                f"✍️ Envoyez le nouveau nom pour cette catégorie :",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Retour", callback_data=f"edit_cat_{category}")
-                ]]),
-                parse_mode='Markdown'
-            )
-            return WAITING_NEW_CATEGORY_NAME
-
-    elif query.data.startswith("add_soldout_"):
-        if str(query.from_user.id) in ADMIN_IDS:
-            category = query.data.replace("add_soldout_", "")
-            # Demander confirmation avant d'ajouter SOLD OUT
-            keyboard = [
-                [
-                    InlineKeyboardButton("✅ Oui, mettre en SOLD OUT", callback_data=f"confirm_soldout_{category}"),
-                    InlineKeyboardButton("❌ Non, annuler", callback_data=f"edit_cat_{category}")
-                ]
-            ]
-            await query.message.edit_text(
-                f"⚠️ *Attention!*\n\n"
-                f"Vous êtes sur le point de mettre la catégorie *{category}* en SOLD OUT.\n\n"
-                f"❗ *Cela supprimera tous les produits existants* dans cette catégorie.\n\n"
-                f"Êtes-vous sûr de vouloir continuer?",
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='Markdown'
-            )
-            return EDITING_CATEGORY
+    elif query.data == "start_broadcast":
+        return await admin_features.handle_broadcast(update, context)
 
-    elif query.data.startswith("confirm_soldout_"):
-        if str(query.from_user.id) in ADMIN_IDS:
-            category = query.data.replace("confirm_soldout_", "")
-            # Vider la catégorie et ajouter le produit SOLD OUT
-            CATALOG[category] = [{
-                'name': 'SOLD OUT ! ❌',
-                'price': 'Non disponible',
-                'description': 'Cette catégorie est temporairement en rupture de stock.',
-                'media': []
-            }]
-            save_catalog(CATALOG)
-            await query.answer("✅ SOLD OUT ajouté avec succès!")
-                
-            # Retourner au menu d'édition des catégories
-            keyboard = []
-            for cat in CATALOG.keys():
-                keyboard.append([InlineKeyboardButton(
-                    f"{cat} {'(SOLD OUT ❌)' if not CATALOG[cat] or (len(CATALOG[cat]) == 1 and CATALOG[cat][0].get('name') == 'SOLD OUT ! ❌') else ''}",
-                    callback_data=f"edit_cat_{cat}"
-                )])
-            keyboard.append([InlineKeyboardButton("🔙 Retour", callback_data="admin")])
-            await query.message.edit_text(
-                "Choisissez une catégorie à modifier:",
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            return EDITING_CATEGORY
+    elif query.data == "add_category":
+        await query.message.edit_text(
+            "📝 Veuillez entrer le nom de la nouvelle catégorie:",
+            reply_markup=_CANCEL_ADD_CATEGORY_MARKUP
+        )
+        context.user_data['prev_prompt_id'] = query.message.message_id
+        return WAITING_CATEGORY_NAME
 
-    elif query.data == "toggle_access_code":
-            if str(update.effective_user.id) not in ADMIN_IDS:
-                await query.answer("❌ Vous n'êtes pas autorisé à modifier ce paramètre.")
-                return CHOOSING
-            
-            is_enabled = access_manager.toggle_access_code()
-            status = "activé ✅" if is_enabled else "désactivé ❌"
-        
-            # Afficher un message temporaire
-            await query.answer(f"Le système de code d'accès a été {status}")
+    elif query.data == "add_product":
+        keyboard = [[InlineKeyboardButton(category, callback_data=f"select_category_{category}")]
+                    for category in CATALOG_CATEGORIES]
+        keyboard.append([InlineKeyboardButton("🔙 Annuler", callback_data="cancel_add_product")])
         
-            # Rafraîchir le menu admin
-            return await show_admin_menu(update, context)
-
-    elif query.data == "edit_order_button":
-            # Gérer l'affichage des configurations actuelles
-            if CONFIG.get('order_url'):
-                current_config = CONFIG['order_url']
-                config_type = "URL"
-            elif CONFIG.get('order_text'):
-                current_config = CONFIG['order_text']
-                config_type = "Texte"
-            else:
-                current_config = 'Non configuré'
-                config_type = "Aucune"
+        await query.message.edit_text(
+            "📝 Sélectionnez la catégorie pour le nouveau produit:",
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+        return SELECTING_CATEGORY
 
-            message = await query.message.edit_text(
-                "🛒 Configuration du bouton Commander 🛒\n\n"
-                f"<b>Configuration actuelle</b> ({config_type}):\n"
-                f"{current_config}\n\n"
-                "Vous pouvez :\n"
-                "• Envoyer un pseudo Telegram (avec ou sans @)\n\n"
-                "• Envoyer un message avec formatage HTML (<b>gras</b>, <i>italique</i>, etc)\n\n"
-                "• Envoyer une URL (commençant par http:// ou https://) pour rediriger vers un site",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit_order")
-                ]]),
-                parse_mode='HTML'  # Ajout du support HTML
+    elif query.data.startswith("select_category_"):
+        # Ne traiter que si ce n'est PAS une action de suppression
+        if not query.data.startswith("select_category_to_delete_"):
+            category = query.data.removeprefix("select_category_")
+            context.user_data['wizard'] = {'category': category}
+            
+            await query.message.edit_text(
+                "📝 Veuillez entrer le nom du nouveau produit:",
+                reply_markup=_CANCEL_ADD_PRODUCT_MARKUP
             )
-            context.user_data['edit_order_button_message_id'] = message.message_id
-            return WAITING_ORDER_BUTTON_CONFIG
+            context.user_data['prev_prompt_id'] = query.message.message_id
+            return WAITING_PRODUCT_NAME
 
     elif query.data == "show_order_text":
         try:
             # Récupérer le message de commande configuré
             order_text = CONFIG.get('order_text', "Aucun message configuré")
         
-            # Extraire la catégorie du message précédent
-            category = None
-            for markup_row in query.message.reply_markup.inline_keyboard:
-                for button in markup_row:
-                    if button.callback_data and button.callback_data.startswith("view_"):
-                        category = button.callback_data.replace("view_", "")
-                        break
-                if category:
-                    break
-        
+            # Catégorie mémorisée par view_ / product_, sinon retour à l'accueil
+            category = context.user_data.get('current_category')
             keyboard = [[
-                InlineKeyboardButton("🔙 Retour aux produits", callback_data=f"view_{category}")
+                InlineKeyboardButton("🔙 Retour aux produits",
+                                     callback_data=f"view_{category}" if category else "back_to_home")
             ]]
         
             # Modifier le message existant au lieu d'en créer un nouveau
@@ -2385,8 +2659,8 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
             )
             return CHOOSING
         
-        except Exception as e:
-            print(f"Erreur lors de l'affichage du message: {e}")
+        except Exception:
+            logger.exception("Erreur lors de l'affichage du message")
             await query.answer("Une erreur est survenue lors de l'affichage du message", show_alert=True)
             return CHOOSING
 
@@ -2402,88 +2676,20 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
                 "• <b>texte</b> pour le gras\n"
                 "• <i>texte</i> pour l'italique\n"
                 "• <u>texte</u> pour le souligné",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit_welcome")
-                ]]),
+                reply_markup=_CANCEL_EDIT_WELCOME_MARKUP,
                 parse_mode='HTML'
             )
             context.user_data['edit_welcome_message_id'] = message.message_id
             return WAITING_WELCOME_MESSAGE
 
     elif query.data == "show_stats":
-        # Configuration du fuseau horaire Paris
-        paris_tz = pytz.timezone('Europe/Paris')
-        utc_now = datetime.utcnow()
-        paris_now = utc_now.replace(tzinfo=pytz.UTC).astimezone(paris_tz)
-
-        # Initialisation des stats si nécessaire
-        if 'stats' not in CATALOG:
-            CATALOG['stats'] = {
-                "total_views": 0,
-                "category_views": {},
-                "product_views": {},
-                "last_updated": paris_now.strftime("%H:%M:%S"),
-                "last_reset": paris_now.strftime("%Y-%m-%d")
-            }
-    
-        # Nettoyer les stats avant l'affichage
-        clean_stats()
-    
-        stats = CATALOG['stats']
-        text = "📊 *Statistiques du catalogue*\n\n"
-        text += f"👥 Vues totales: {stats.get('total_views', 0)}\n"
-    
-        # Conversion de l'heure en fuseau horaire Paris
-        last_updated = stats.get('last_updated', 'Jamais')
-        if last_updated != 'Jamais':
-            try:
-                if len(last_updated) > 8:  # Si format complet
-                    dt = datetime.strptime(last_updated, "%Y-%m-%d %H:%M:%S")
-                else:  # Si format HH:MM:SS
-                    today = paris_now.strftime("%Y-%m-%d")
-                    dt = datetime.strptime(f"{today} {last_updated}", "%Y-%m-%d %H:%M:%S")
-            
-                # Convertir en timezone Paris
-                dt = dt.replace(tzinfo=pytz.UTC).astimezone(paris_tz)
-                last_updated = dt.strftime("%H:%M:%S")
-            except Exception as e:
-                print(f"Erreur conversion heure: {e}")
-            
-        text += f"🕒 Dernière mise à jour: {last_updated}\n"
-    
-        if 'last_reset' in stats:
-            text += f"🔄 Dernière réinitialisation: {stats.get('last_reset', 'Jamais')}\n"
-        text += "\n"
-    
-        # Le reste du code reste identique
-        text += "📈 *Vues par catégorie:*\n"
-        category_views = stats.get('category_views', {})
-        if category_views:
-            sorted_categories = sorted(category_views.items(), key=lambda x: x[1], reverse=True)
-            for category, views in sorted_categories:
-                if category in CATALOG:
-                    text += f"- {category}: {views} vues\n"
-        else:
-            text += "Aucune vue enregistrée.\n"
-
-        text += "\n━━━━━━━━━━━━━━━\n\n"
-    
-        text += "🔥 *Produits les plus populaires:*\n"
-        product_views = stats.get('product_views', {})
-        if product_views:
-            all_products = []
-            for category, products in product_views.items():
-                if category in CATALOG:
-                    existing_products = [p['name'] for p in CATALOG[category]]
-                    for product_name, views in products.items():
-                        if product_name in existing_products:
-                            all_products.append((category, product_name, views))
-        
-            sorted_products = sorted(all_products, key=lambda x: x[2], reverse=True)[:5]
-            for category, product_name, views in sorted_products:
-                text += f"- {product_name} ({category}): {views} vues\n"
-        else:
-            text += "Aucune vue enregistrée sur les produits.\n"
+        # Le texte n'est reconstruit que si le catalogue ou les statistiques ont changé
+        if _STATS_RENDER_CACHE['version'] != _STATS_VERSION:
+            text = build_stats_text()
+            # Lu après la construction : clean_stats() peut avoir incrémenté la version
+            _STATS_RENDER_CACHE['version'] = _STATS_VERSION
+            _STATS_RENDER_CACHE['text'] = text
+        text = _STATS_RENDER_CACHE['text']
     
         keyboard = [
             [InlineKeyboardButton("🔄 Réinitialiser les statistiques", callback_data="confirm_reset_stats")],
@@ -2515,9 +2721,7 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
                 "Vous pouvez :\n"
                 "• Envoyer un pseudo Telegram (avec ou sans @)\n"
                 "• Envoyer une URL (commençant par http:// ou https://) pour rediriger vers un site",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit_contact")
-                ]]),
+                reply_markup=_CANCEL_EDIT_CONTACT_MARKUP,
                 parse_mode='HTML'
             )
             context.user_data['edit_contact_message_id'] = query.message.message_id
@@ -2528,56 +2732,52 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
         return await show_admin_menu(update, context)
 
     elif query.data == "back_to_categories":
-        if 'category_message_id' in context.user_data:
+        category_message_id = context.user_data.get('category_message_id')
+        if category_message_id is not None:
             try:
                 await context.bot.edit_message_text(
                     chat_id=query.message.chat_id,
-                    message_id=context.user_data['category_message_id'],
+                    message_id=category_message_id,
                     text=context.user_data['category_message_text'],
                     reply_markup=InlineKeyboardMarkup(context.user_data['category_message_reply_markup']),
                     parse_mode='Markdown'
                 )
-            except Exception as e:
-                print(f"Erreur lors de la mise à jour du message des catégories: {e}")
+            except Exception:
+                logger.exception("Erreur lors de la mise à jour du message des catégories")
         else:
             # Si le message n'existe pas, recréez-le
-            keyboard = []
-            for category in CATALOG.keys():
-                if category != 'stats':
-                    keyboard.append([InlineKeyboardButton(category, callback_data=f"view_{category}")])
-
-            keyboard.append([InlineKeyboardButton("🔙 Retour à l'accueil", callback_data="back_to_home")])
-
             await query.edit_message_text(
-                "📋 *Menu*\n\n"
-                "Choisissez une catégorie pour voir les produits :",
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                CATEGORY_MENU_TEXT,
+                reply_markup=category_menu_markup(),
                 parse_mode='Markdown'
             )
 
     elif query.data == "skip_media":
-        category = context.user_data.get('temp_product_category')
+        wiz = context.user_data.get('wizard', {})
+        category = wiz.get('category')
         if category:
             new_product = {
-                'name': context.user_data.get('temp_product_name'),
-                'price': context.user_data.get('temp_product_price'),
-                'description': context.user_data.get('temp_product_description')
+                'name': wiz.get('name'),
+                'price': wiz.get('price'),
+                'description': wiz.get('description')
             }
             
             if category not in CATALOG:
                 CATALOG[category] = []
+            # Le SOLD OUT n'est retiré qu'à l'ajout effectif du produit
+            _clear_soldout(category)
             CATALOG[category].append(new_product)
-            save_catalog(CATALOG)
+            mark_catalog_dirty()
             
-            context.user_data.clear()
+            clear_user_keys(context, PRODUCT_WIZARD_KEYS)
             return await show_admin_menu(update, context)
             
     elif query.data.startswith("product_"):
         try:
             _, nav_id = query.data.split("_", 1)
-            print(f"nav_id reçu: {nav_id}")
+            logger.debug("nav_id reçu: %s", nav_id)
             product_info = context.user_data.get(f'nav_product_{nav_id}')
-            print(f"product_info trouvé: {product_info}")
+            logger.debug("product_info trouvé: %s", product_info)
 
             if not product_info:
                 await query.answer("Produit non trouvé")
@@ -2585,15 +2785,17 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
 
             category = product_info['category']
             product_name = product_info['name']
-            print(f"Catégorie: {category}, Nom du produit: {product_name}")
+            logger.debug("Catégorie: %s, Nom du produit: %s", category, product_name)
 
             prev_product, next_product = get_sibling_products(category, product_name, query.from_user.id)
-            print(f"Produit précédent: {prev_product['name'] if prev_product else None}")
-            print(f"Produit suivant: {next_product['name'] if next_product else None}")
+            logger.debug("Produit précédent: %s", prev_product['name'] if prev_product else None)
+            logger.debug("Produit suivant: %s", next_product['name'] if next_product else None)
 
-            product = next((p for p in CATALOG[category] if p['name'] == product_name), None)
+            product = CATALOG_INDEX.get(category, {}).get(product_name)
 
             if product:
+                # Catégorie de retour pour show_order_text
+                context.user_data['current_category'] = category
                 caption = f"📱 <b>{product['name']}</b>\n\n"
                 caption += f"💰 <b>Prix:</b>\n{product['price']}\n\n"
                 caption += f"📝 <b>Description:</b>\n{product['description']}"
@@ -2603,7 +2805,6 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
                 # Navigation des médias (en premier)
                 if 'media' in product and product['media']:
                     media_list = product['media']
-                    media_list = sorted(media_list, key=lambda x: x.get('order_index', 0))
                     total_media = len(media_list)
                     context.user_data['current_media_index'] = 0
                     current_media = media_list[0]
@@ -2618,18 +2819,10 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
                 if prev_product or next_product:
                     product_nav = []
                     if prev_product:
-                        new_nav_id = str(abs(hash(prev_product['name'])) % 10000)
-                        context.user_data[f'nav_product_{new_nav_id}'] = {
-                            'category': category,
-                            'name': prev_product['name']
-                        }
+                        new_nav_id = register_nav_product(context, category, prev_product['name'])
                         product_nav.append(InlineKeyboardButton("◀️ Produit précédent", callback_data=f"product_{new_nav_id}"))
                     if next_product:
-                        new_nav_id = str(abs(hash(next_product['name'])) % 10000)
-                        context.user_data[f'nav_product_{new_nav_id}'] = {
-                            'category': category,
-                            'name': next_product['name']
-                        }
+                        new_nav_id = register_nav_product(context, category, next_product['name'])
                         product_nav.append(InlineKeyboardButton("Produit suivant ▶️", callback_data=f"product_{new_nav_id}"))
                     keyboard.append(product_nav)
 
@@ -2651,35 +2844,13 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
                     try:
                         await query.message.delete()
                     except Exception as e:
-                        print(f"Erreur lors de la suppression du message: {e}")
+                        logger.warning("Suppression du message impossible: %s", e)
 
-                    try:
-                        if current_media['media_type'] == 'photo':
-                            message = await context.bot.send_photo(
-                                chat_id=query.message.chat_id,
-                                photo=current_media['media_id'],
-                                caption=caption,
-                                reply_markup=InlineKeyboardMarkup(keyboard),
-                                parse_mode='HTML'
-                            )
-                        else:  # video
-                            message = await context.bot.send_video(
-                                chat_id=query.message.chat_id,
-                                video=current_media['media_id'],
-                                caption=caption,
-                                reply_markup=InlineKeyboardMarkup(keyboard),
-                                parse_mode='HTML'
-                            )
-                        context.user_data['last_product_message_id'] = message.message_id
-                    except Exception as e:
-                        print(f"Erreur lors de l'envoi du média: {e}")
-                        message = await context.bot.send_message(
-                            chat_id=query.message.chat_id,
-                            text=f"{caption}\n\n⚠️ Le média n'a pas pu être chargé",
-                            reply_markup=InlineKeyboardMarkup(keyboard),
-                            parse_mode='HTML'
-                        )
-                        context.user_data['last_product_message_id'] = message.message_id
+                    message = await send_product_media(
+                        context.bot, query.message.chat_id, current_media, caption,
+                        InlineKeyboardMarkup(keyboard)
+                    )
+                    context.user_data['last_product_message_id'] = message.message_id
                 else:
                     # Pour les produits sans média, on essaie d'abord d'éditer
                     try:
@@ -2690,13 +2861,13 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
                             parse_mode='HTML'
                         )
                     except Exception as e:
-                        print(f"Erreur lors de l'édition du message: {e}")
+                        logger.debug("Édition du message impossible, renvoi: %s", e)
                         # Si l'édition échoue (probablement parce qu'on vient d'un produit avec média)
                         # On supprime l'ancien message s'il existe
                         try:
                             await query.message.delete()
                         except Exception as e:
-                            print(f"Erreur lors de la suppression de l'ancien message: {e}")
+                            logger.warning("Suppression de l'ancien message impossible: %s", e)
                         
                         # Et on crée un nouveau message
                         message = await context.bot.send_message(
@@ -2710,66 +2881,36 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
                 await query.answer()
 
                 # Incrémenter les stats
-                if 'stats' not in CATALOG:
-                    CATALOG['stats'] = {
-                        "total_views": 0,
-                        "category_views": {},
-                        "product_views": {},
-                        "last_updated": datetime.now(paris_tz).strftime("%H:%M:%S")
-                    }
-
-                if 'product_views' not in CATALOG['stats']:
-                    CATALOG['stats']['product_views'] = {}
-                if category not in CATALOG['stats']['product_views']:
-                    CATALOG['stats']['product_views'][category] = {}
-                if product['name'] not in CATALOG['stats']['product_views'][category]:
-                    CATALOG['stats']['product_views'][category][product['name']] = 0
-
-                CATALOG['stats']['product_views'][category][product['name']] += 1
-                CATALOG['stats']['total_views'] += 1
-                CATALOG['stats']['last_updated'] = datetime.now(paris_tz).strftime("%H:%M:%S")
-                save_catalog(CATALOG)
+                stats = _ensure_stats()
+                views = stats.setdefault('product_views', {}).setdefault(category, {})
+                views[product['name']] = views.get(product['name'], 0) + 1
+                stats['total_views'] = stats.get('total_views', 0) + 1
+                stats['last_updated'] = _now_str()
+                mark_catalog_dirty(structure=False)
 
-        except Exception as e:
-            print(f"Erreur lors de l'affichage du produit: {e}")
+        except Exception:
+            logger.exception("Erreur lors de l'affichage du produit")
             await query.answer("Une erreur est survenue")
             
     elif query.data.startswith("view_"):
-        category = query.data.replace("view_", "")
+        category = query.data.removeprefix("view_")
         if category in CATALOG:
-            # Initialisation des stats si nécessaire
-            if 'stats' not in CATALOG:
-                CATALOG['stats'] = {
-                    "total_views": 0,
-                    "category_views": {},
-                    "product_views": {},
-                    "last_updated": datetime.now(paris_tz).strftime("%H:%M:%S")
-                }
-
-            if 'category_views' not in CATALOG['stats']:
-                CATALOG['stats']['category_views'] = {}
-
-            if category not in CATALOG['stats']['category_views']:
-                CATALOG['stats']['category_views'][category] = 0
-
+            context.user_data['current_category'] = category
             # Mettre à jour les statistiques
-            CATALOG['stats']['category_views'][category] += 1
-            CATALOG['stats']['total_views'] += 1
-            CATALOG['stats']['last_updated'] = datetime.now(paris_tz).strftime("%H:%M:%S")
-            save_catalog(CATALOG)
+            stats = _ensure_stats()
+            category_views = stats.setdefault('category_views', {})
+            category_views[category] = category_views.get(category, 0) + 1
+            stats['total_views'] = stats.get('total_views', 0) + 1
+            stats['last_updated'] = _now_str()
+            mark_catalog_dirty(structure=False)
 
             products = CATALOG[category]
             # Afficher la liste des produits
             text = f"*{category}*\n\n"
             keyboard = []
             for product in products:
-                # Créer un ID court unique pour ce produit
-                nav_id = str(random.randint(1000, 9999))
-                # Stocker les informations du produit avec cet ID
-                context.user_data[f'nav_product_{nav_id}'] = {
-                    'category': category,
-                    'name': product['name']
-                }
+                # Récupérer l'ID court de ce produit
+                nav_id = register_nav_product(context, category, product['name'])
                 keyboard.append([InlineKeyboardButton(
                     product['name'],
                     callback_data=f"product_{nav_id}"  # Utiliser l'ID court
@@ -2779,18 +2920,18 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
 
             try:
                 # Suppression du dernier message de produit (photo ou vidéo) si existe
-                if 'last_product_message_id' in context.user_data:
+                last_product_message_id = context.user_data.pop('last_product_message_id', None)
+                if last_product_message_id is not None:
                     try:
                         await context.bot.delete_message(
                             chat_id=query.message.chat_id,
-                            message_id=context.user_data['last_product_message_id']
+                            message_id=last_product_message_id
                         )
-                        del context.user_data['last_product_message_id']
                     except:
                         pass
 
-                print(f"Texte du message : {text}")
-                print(f"Clavier : {keyboard}")
+                logger.debug("Texte du message : %s", text)
+                logger.debug("Clavier : %s", keyboard)
 
                 # Éditer le message existant au lieu de le supprimer et recréer
                 await query.message.edit_text(
@@ -2803,8 +2944,8 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
                 context.user_data['category_message_text'] = text
                 context.user_data['category_message_reply_markup'] = keyboard
 
-            except Exception as e:
-                print(f"Erreur lors de la mise à jour du message des produits: {e}")
+            except Exception:
+                logger.exception("Erreur lors de la mise à jour du message des produits")
                 # Si l'édition échoue, on crée un nouveau message
                 message = await context.bot.send_message(
                     chat_id=query.message.chat_id,
@@ -2816,27 +2957,12 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
 
             # Mettre à jour les stats des produits seulement s'il y en a
             if products:
-                if 'stats' not in CATALOG:
-                    CATALOG['stats'] = {
-                        "total_views": 0,
-                        "category_views": {},
-                        "product_views": {},
-                        "last_updated": datetime.now(paris_tz).strftime("%H:%M:%S"),
-                        "last_reset": datetime.now(paris_tz).strftime("%Y-%m-%d")
-                    }
-
-                if 'product_views' not in CATALOG['stats']:
-                    CATALOG['stats']['product_views'] = {}
-                if category not in CATALOG['stats']['product_views']:
-                    CATALOG['stats']['product_views'][category] = {}
-
+                views = _ensure_stats().setdefault('product_views', {}).setdefault(category, {})
                 # Mettre à jour les stats pour chaque produit dans la catégorie
                 for product in products:
-                    if product['name'] not in CATALOG['stats']['product_views'][category]:
-                        CATALOG['stats']['product_views'][category][product['name']] = 0
-                    CATALOG['stats']['product_views'][category][product['name']] += 1
+                    views[product['name']] = views.get(product['name'], 0) + 1
 
-                save_catalog(CATALOG)
+                mark_catalog_dirty(structure=False)
                 
     elif query.data.startswith(("next_", "prev_")):
         try:
@@ -2851,10 +2977,10 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
             product_name = product_info['name']
         
             # Récupérer le produit
-            product = next((p for p in CATALOG[category] if p['name'] == product_name), None)
+            product = CATALOG_INDEX.get(category, {}).get(product_name)
 
             if product and 'media' in product:
-                media_list = sorted(product['media'], key=lambda x: x.get('order_index', 0))
+                media_list = product['media']
                 total_media = len(media_list)
                 current_index = context.user_data.get('current_media_index', 0)
 
@@ -2890,21 +3016,11 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
                 if prev_product or next_product:
                     product_nav = []
                     if prev_product:
-                        # Au lieu de générer un nouvel ID aléatoire, utilisez un ID basé sur le nom du produit
-                        prev_nav_id = str(abs(hash(prev_product['name'])) % 10000)
-                        context.user_data[f'nav_product_{prev_nav_id}'] = {
-                            'category': category,
-                            'name': prev_product['name']
-                        }
+                        prev_nav_id = register_nav_product(context, category, prev_product['name'])
                         product_nav.append(InlineKeyboardButton("◀️ Produit précédent", callback_data=f"product_{prev_nav_id}"))
     
                     if next_product:
-                        # Même chose pour le produit suivant
-                        next_nav_id = str(abs(hash(next_product['name'])) % 10000)
-                        context.user_data[f'nav_product_{next_nav_id}'] = {
-                            'category': category,
-                            'name': next_product['name']
-                        }
+                        next_nav_id = register_nav_product(context, category, next_product['name'])
                         product_nav.append(InlineKeyboardButton("Produit suivant ▶️", callback_data=f"product_{next_nav_id}"))
                     keyboard.append(product_nav)
 
@@ -2919,65 +3035,43 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
                     InlineKeyboardButton("🔙 Retour à la catégorie", callback_data=f"view_{category}")
                 ])
 
+                # Remplacer le média du message existant : un seul appel et pas de clignotement
+                media_cls = InputMediaPhoto if current_media['media_type'] == 'photo' else InputMediaVideo
                 try:
-                    await query.message.delete()
-                except Exception as e:
-                    print(f"Erreur lors de la suppression du message: {e}")
+                    await query.edit_message_media(
+                        media=media_cls(media=current_media['media_id'], caption=caption, parse_mode='HTML'),
+                        reply_markup=InlineKeyboardMarkup(keyboard)
+                    )
+                    context.user_data['last_product_message_id'] = query.message.message_id
+                    edited = True
+                except BadRequest as e:
+                    # Message texte de secours ou média refusé : supprimer et renvoyer
+                    logger.debug("edit_message_media impossible, renvoi du message: %s", e)
+                    edited = False
+
+                if not edited:
+                    try:
+                        await query.message.delete()
+                    except Exception as e:
+                        logger.warning("Suppression du message impossible: %s", e)
 
-                try:
-                    if current_media['media_type'] == 'photo':
-                        try:
-                            message = await context.bot.send_photo(
-                                chat_id=query.message.chat_id,
-                                photo=current_media['media_id'],
-                                caption=caption,
-                                reply_markup=InlineKeyboardMarkup(keyboard),
-                                parse_mode='HTML'
-                            )
-                        except Exception as e:
-                            print(f"Erreur d'envoi de photo: {e}")
-                            message = await context.bot.send_message(
-                                chat_id=query.message.chat_id,
-                                text=f"{caption}\n\n⚠️ L'image n'a pas pu être chargée",
-                                reply_markup=InlineKeyboardMarkup(keyboard),
-                                parse_mode='HTML'
-                            )
-                    else:  # video
-                        try:
-                            message = await context.bot.send_video(
-                                chat_id=query.message.chat_id,
-                                video=current_media['media_id'],
-                                caption=caption,
-                                reply_markup=InlineKeyboardMarkup(keyboard),
-                                parse_mode='HTML'
-                            )
-                        except Exception as e:
-                            print(f"Erreur d'envoi de vidéo: {e}")
-                            message = await context.bot.send_message(
-                                chat_id=query.message.chat_id,
-                                text=f"{caption}\n\n⚠️ La vidéo n'a pas pu être chargée",
-                                reply_markup=InlineKeyboardMarkup(keyboard),
-                                parse_mode='HTML'
-                            )
-                    context.user_data['last_product_message_id'] = message.message_id
-                except Exception as e:
-                    print(f"Erreur lors de l'envoi du média: {e}")
-                    await query.answer("Une erreur est survenue lors de l'affichage du média")
+                    try:
+                        message = await send_product_media(
+                            context.bot, query.message.chat_id, current_media, caption,
+                            InlineKeyboardMarkup(keyboard)
+                        )
+                        context.user_data['last_product_message_id'] = message.message_id
+                    except Exception:
+                        logger.exception("Erreur lors de l'envoi du média")
+                        await query.answer("Une erreur est survenue lors de l'affichage du média")
 
-        except Exception as e:
-            print(f"Erreur lors de la navigation des médias: {e}")
+        except Exception:
+            logger.exception("Erreur lors de la navigation des médias")
             await query.answer("Une erreur est survenue")
             
     elif query.data == "edit_product":
-        keyboard = []
-        for category in CATALOG.keys():
-            if category != 'stats':
-                keyboard.append([
-                    InlineKeyboardButton(
-                        category, 
-                        callback_data=f"editcat_{category}"  # Raccourci ici
-                    )
-                ])
+        keyboard = [[InlineKeyboardButton(category, callback_data=f"editcat_{category}")]
+                    for category in CATALOG_CATEGORIES]
         keyboard.append([InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")])
         
         await query.message.edit_text(
@@ -2987,16 +3081,17 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
         return SELECTING_CATEGORY
 
     elif query.data.startswith("editcat_"):  # Nouveau gestionnaire avec nom plus court
-        category = query.data.replace("editcat_", "")
+        category = query.data.removeprefix("editcat_")
         products = CATALOG.get(category, [])
         
+        # Le callback_data ne porte qu'un numéro, la table `_ref` de l'utilisateur
+        # garde la vraie catégorie et le vrai nom du produit
         keyboard = []
         for product in products:
             if isinstance(product, dict):
-                # Créer un callback_data plus court
-                callback_data = f"editp_{category[:10]}_{product['name'][:20]}"
+                ref_id = register_edit_ref(context, category, product['name'])
                 keyboard.append([
-                    InlineKeyboardButton(product['name'], callback_data=callback_data)
+                    InlineKeyboardButton(product['name'], callback_data=f"editp_{ref_id}")
                 ])
         keyboard.append([InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")])
         
@@ -3008,13 +3103,10 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
 
     elif query.data.startswith("editp_"):
         try:
-            _, short_category, short_product = query.data.split("_", 2)
-            
-            # Trouver la vraie catégorie et le vrai produit
-            category = next((cat for cat in CATALOG.keys() if cat.startswith(short_category) or short_category.startswith(cat)), None)
-            if category:
-                product_name = next((p['name'] for p in CATALOG[category] if p['name'].startswith(short_product) or short_product.startswith(p['name'])), None)
-                if product_name:
+            ref = context.user_data.get('_ref', {}).get(int(query.data.removeprefix("editp_")))
+            if ref:
+                category, product_name = ref
+                if product_name in CATALOG_INDEX.get(category, {}):
                     context.user_data['editing_category'] = category
                     context.user_data['editing_product'] = product_name
 
@@ -3035,8 +3127,8 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
                     return EDITING_PRODUCT_FIELD
             
             return await show_admin_menu(update, context)
-        except Exception as e:
-            print(f"Erreur dans editp_: {e}")
+        except Exception:
+            logger.exception("Erreur dans editp_")
             return await show_admin_menu(update, context)
 
     elif query.data in ["edit_name", "edit_price", "edit_desc", "edit_media"]:
@@ -3052,17 +3144,19 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
         category = context.user_data.get('editing_category')
         product_name = context.user_data.get('editing_product')
     
-        product = next((p for p in CATALOG[category] if p['name'] == product_name), None)
+        product = CATALOG_INDEX.get(category, {}).get(product_name)
     
         if product:
             if field == 'media':
                 # Stocker les informations du produit en cours d'édition
-                context.user_data['temp_product_category'] = category
-                context.user_data['temp_product_name'] = product_name
-                context.user_data['temp_product_price'] = product.get('price')
-                context.user_data['temp_product_description'] = product.get('description')
-                context.user_data['temp_product_media'] = []
-                context.user_data['media_count'] = 0
+                wiz = context.user_data['wizard'] = {
+                    'category': category,
+                    'name': product_name,
+                    'price': product.get('price'),
+                    'description': product.get('description'),
+                    'media': [],
+                    'media_count': 0
+                }
             
                 # Envoyer le message d'invitation pour les médias
                 message = await query.message.edit_text(
@@ -3074,7 +3168,7 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
                     ]),
                     parse_mode='Markdown'
                 )
-                context.user_data['media_invitation_message_id'] = message.message_id
+                wiz['invitation_id'] = message.message_id
                 return WAITING_PRODUCT_MEDIA
             else:
                 # Votre code existant pour les autres champs
@@ -3088,10 +3182,9 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
                     f"✏️ Modification du {field_names.get(field, field)}\n"
                     f"Valeur actuelle : {current_value}\n\n"
                     "Envoyez la nouvelle valeur :",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🔙 Annuler", callback_data="cancel_edit")
-                    ]])
+                    reply_markup=_CANCEL_EDIT_MARKUP
                 )
+                context.user_data['prev_prompt_id'] = query.message.message_id
                 return WAITING_NEW_VALUE
 
     elif query.data == "cancel_edit":
@@ -3099,15 +3192,15 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
 
     elif query.data == "confirm_reset_stats":
         # Réinitialiser les statistiques
-        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        now = datetime.now(paris_tz)
         CATALOG['stats'] = {
             "total_views": 0,
             "category_views": {},
             "product_views": {},
-            "last_updated": now.split(" ")[1],  # Juste l'heure
-            "last_reset": now.split(" ")[0]  # Juste la date
+            "last_updated": now.isoformat(timespec='seconds'),
+            "last_reset": now.strftime("%Y-%m-%d")
         }
-        save_catalog(CATALOG)
+        mark_catalog_dirty(structure=False)
         
         # Afficher un message de confirmation
         keyboard = [[InlineKeyboardButton("🔙 Retour au menu", callback_data="admin")]]
@@ -3120,31 +3213,22 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
         )
                
     elif query.data == "show_categories":
-        keyboard = []
-        # Créer uniquement les boutons de catégories
-        for category in CATALOG.keys():
-            if category != 'stats':
-                keyboard.append([InlineKeyboardButton(category, callback_data=f"view_{category}")])
-
-        # Ajouter uniquement le bouton retour à l'accueil
-        keyboard.append([InlineKeyboardButton("🔙 Retour à l'accueil", callback_data="back_to_home")])
-
+        # Boutons de catégories et retour à l'accueil uniquement
+        markup = category_menu_markup()
         try:
             message = await query.edit_message_text(
-                "📋 *Menu*\n\n"
-                "Choisissez une catégorie pour voir les produits :",
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                CATEGORY_MENU_TEXT,
+                reply_markup=markup,
                 parse_mode='Markdown'
             )
             context.user_data['menu_message_id'] = message.message_id
-        except Exception as e:
-            print(f"Erreur lors de la mise à jour du message des catégories: {e}")
+        except Exception:
+            logger.exception("Erreur lors de la mise à jour du message des catégories")
             # Si la mise à jour échoue, recréez le message
             message = await context.bot.send_message(
                 chat_id=query.message.chat_id,
-                text="📋 *Menu*\n\n"
-                     "Choisissez une catégorie pour voir les produits :",
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                text=CATEGORY_MENU_TEXT,
+                reply_markup=markup,
                 parse_mode='Markdown'
             )
             context.user_data['menu_message_id'] = message.message_id
@@ -3159,31 +3243,10 @@ async def handle_normal_buttons(update: Update, context: ContextTypes.DEFAULT_TY
                 "📋 Cliquez sur MENU pour voir les catégories"
             )
 
-            # Commencer avec le bouton MENU
-            keyboard = [
-                [InlineKeyboardButton("📋 MENU", callback_data="show_categories")]
-            ]
-
-            # Ajouter les boutons personnalisés
-            with open('config/config.json', 'r') as f:
-                config = json.load(f)
-
-            for button in config.get('custom_buttons', []):
-                if button['type'] == 'url':
-                    keyboard.append([InlineKeyboardButton(button['name'], url=button['value'])])
-                elif button['type'] == 'text':
-                    keyboard.append([InlineKeyboardButton(button['name'], callback_data=f"custom_text_{button['id']}")])
-
-            # Ajouter le bouton Réseaux avant le bouton Admin
-            keyboard.append([InlineKeyboardButton("📱 Réseaux", callback_data="show_networks")])
-
-            # Ajouter le bouton admin en dernier si l'utilisateur est administrateur
-            if str(update.effective_user.id) in ADMIN_IDS:
-                keyboard.append([InlineKeyboardButton("🔧 Menu Admin", callback_data="admin")])
-
+            # Clavier d'accueil construit depuis CONFIG, partagé avec start()
             await query.message.edit_text(
                 text=welcome_text,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=get_home_menu_markup(update.effective_user.id in ADMIN_IDS),
                 parse_mode='HTML'  
             )
             return CHOOSING
@@ -3193,9 +3256,8 @@ async def get_file_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.message.photo:
         file_id = update.message.photo[-1].file_id
         CONFIG['banner_image'] = file_id
-        # Sauvegarder dans config.json
-        with open('config.json', 'w', encoding='utf-8') as f:
-            json.dump(CONFIG, f, indent=4)
+        # Sauvegarde différée de config.json
+        mark_config_dirty()
         await update.message.reply_text(
             f"✅ Image banner enregistrée!\nFile ID: {file_id}"
         )
@@ -3213,7 +3275,7 @@ async def get_file_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ]
 
     # Ajouter le bouton admin si l'utilisateur est administrateur
-    if str(update.effective_user.id) in ADMIN_IDS:
+    if update.effective_user.id in ADMIN_IDS:
         keyboard.append([InlineKeyboardButton("🔧 Menu Admin", callback_data="admin")])
 
     # Configurer le bouton de contact en fonction du type (URL ou username)
@@ -3305,6 +3367,31 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     except Exception as e:
         print(f"Erreur dans le gestionnaire d'erreurs: {e}")
         
+async def post_init(application: Application) -> None:
+    """Démarre les tâches d'écriture différée du catalogue et de la configuration"""
+    global _catalog_flush_task, _config_flush_task
+    # asyncio.create_task et non application.create_task : Application.stop()
+    # attendrait la fin de ces boucles infinies
+    _catalog_flush_task = asyncio.create_task(_catalog_flusher())
+    _config_flush_task = asyncio.create_task(_config_flusher())
+
+async def post_shutdown(application: Application) -> None:
+    """Arrête les tâches d'écriture et sauvegarde les dernières modifications"""
+    for task in (_catalog_flush_task, _config_flush_task):
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    if _CATALOG_DIRTY.is_set():
+        _CATALOG_DIRTY.clear()
+        save_catalog(CATALOG)
+    if _CONFIG_DIRTY.is_set():
+        _CONFIG_DIRTY.clear()
+        async with _CONFIG_LOCK:
+            save_config()
+
 def main():
     """Fonction principale du bot"""
     try:
@@ -3319,6 +3406,14 @@ def main():
             .get_updates_read_timeout(30.0)
             .get_updates_write_timeout(30.0)
             .get_updates_connect_timeout(30.0)
+            # Pool de connexions élargi pour les appels API envoyés en parallèle
+            .connection_pool_size(256)
+            .pool_timeout(30.0)
+            .get_updates_connection_pool_size(32)
+            # Pas de concurrent_updates : ConversationHandler suppose que les mises à jour
+            # sont traitées une par une (état et user_data des assistants)
+            .post_init(post_init)
+            .post_shutdown(post_shutdown)
             .build()
         )
         admin_features = AdminFeatures()
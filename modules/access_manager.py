@@ -1,14 +1,21 @@
 import json
 import random
+import re
 import string
 from datetime import datetime, timedelta
 import os
 
+from modules.file_utils import write_file_atomic
+
+# Format des codes produits par generate_code, toute autre saisie est rejetée sans recherche
+_CODE_PATTERN = re.compile(r'^[A-Z0-9]{8}$')
+
 class AccessManager:
     def __init__(self):
         self.access_file = "data/access_codes.json"
         self._ensure_file_exists()
-        
+        self._load()
+
     def _ensure_file_exists(self):
         """Crée le fichier d'accès s'il n'existe pas"""
         if not os.path.exists("data"):
@@ -20,64 +27,97 @@ class AccessManager:
                     "authorized_users": []
                 }, f, indent=4)
 
+    def _load(self):
+        """Charge le fichier une seule fois et construit les index en mémoire"""
+        with open(self.access_file, 'r') as f:
+            self._data = json.load(f)
+        self._authorized_users = set(self._data["authorized_users"])
+        self._code_index = {}
+        self._expirations = {}
+        for c in self._data["codes"]:
+            self._index_code(c)
+
+    def _index_code(self, entry: dict):
+        """Indexe un code et garde sa date d'expiration déjà convertie"""
+        exp_date = datetime.fromisoformat(entry["expiration"])
+        # Les anciens codes n'ont pas de date formatée, la calculer une seule fois
+        entry.setdefault("expiration_fmt", exp_date.strftime("%d/%m/%Y %H:%M"))
+        self._code_index[entry["code"]] = entry
+        self._expirations[entry["code"]] = exp_date
+
+    def _purge_expired(self, now: datetime):
+        """Retire les codes expirés des index et des données"""
+        expired = [code for code, exp in self._expirations.items() if exp <= now]
+        for code in expired:
+            del self._code_index[code]
+            del self._expirations[code]
+        if expired:
+            self._data["codes"] = [c for c in self._data["codes"] if c["code"] in self._code_index]
+
+    def _save(self):
+        """Écrit l'état en mémoire dans le fichier d'accès, de façon atomique"""
+        write_file_atomic(self.access_file, json.dumps(self._data, indent=4).encode())
+
     def generate_code(self, admin_id: int) -> tuple[str, str]:
         """Génère un nouveau code d'accès"""
         code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-        expiration = (datetime.now() + timedelta(hours=24)).isoformat()
-        
-        with open(self.access_file, 'r') as f:
-            data = json.load(f)
-        
-        data["codes"].append({
+        now = datetime.now()
+        exp_date = now + timedelta(hours=24)
+        expiration = exp_date.isoformat()
+
+        self._purge_expired(now)
+        entry = {
             "code": code,
             "expiration": expiration,
+            "expiration_fmt": exp_date.strftime("%d/%m/%Y %H:%M"),
             "created_by": admin_id,
             "used": False
-        })
-        
-        with open(self.access_file, 'w') as f:
-            json.dump(data, f, indent=4)
-            
+        }
+        self._data["codes"].append(entry)
+        self._index_code(entry)
+        self._save()
+
         return code, expiration
 
     def verify_code(self, code: str, user_id: int) -> tuple[bool, str]:
         """Vérifie un code d'accès"""
-        with open(self.access_file, 'r') as f:
-            data = json.load(f)
-        
-        if user_id in data["authorized_users"]:
+        if user_id in self._authorized_users:
             return True, "already_authorized"
 
+        if not _CODE_PATTERN.match(code):
+            return False, "invalid"
+
+        entry = self._code_index.get(code)
+        if entry is None or entry["used"]:
+            return False, "invalid"
+
         now = datetime.now()
-        
-        # Nettoyer les codes expirés
-        data["codes"] = [c for c in data["codes"] 
-                        if datetime.fromisoformat(c["expiration"]) > now]
-        
-        for c in data["codes"]:
-            if c["code"] == code and not c["used"]:
-                if datetime.fromisoformat(c["expiration"]) > now:
-                    c["used"] = True
-                    data["authorized_users"].append(user_id)
-                    with open(self.access_file, 'w') as f:
-                        json.dump(data, f, indent=4)
-                    return True, "success"
-                else:
-                    return False, "expired"
-        
-        return False, "invalid"
-    
+        if self._expirations[code] <= now:
+            return False, "expired"
+
+        entry["used"] = True
+        self._authorized_users.add(user_id)
+        self._data["authorized_users"].append(user_id)
+        self._purge_expired(now)
+        self._save()
+        return True, "success"
+
     def is_authorized(self, user_id: int) -> bool:
         """Vérifie si un utilisateur est autorisé"""
-        with open(self.access_file, 'r') as f:
-            data = json.load(f)
-        return user_id in data["authorized_users"]
-    
+        return user_id in self._authorized_users
+
+    def is_access_code_enabled(self) -> bool:
+        """Indique si le code d'accès est exigé (activé par défaut)"""
+        return self._data.get("enabled", True)
+
+    def toggle_access_code(self) -> bool:
+        """Active ou désactive le code d'accès, renvoie le nouvel état"""
+        self._data["enabled"] = not self.is_access_code_enabled()
+        self._save()
+        return self._data["enabled"]
+
     def list_active_codes(self) -> list:
         """Liste tous les codes actifs"""
-        with open(self.access_file, 'r') as f:
-            data = json.load(f)
-        
         now = datetime.now()
-        return [c for c in data["codes"] 
-                if not c["used"] and datetime.fromisoformat(c["expiration"]) > now]
\ No newline at end of file
+        return [c for c in self._code_index.values()
+                if not c["used"] and self._expirations[c["code"]] > now]
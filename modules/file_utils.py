@@ -0,0 +1,23 @@
+import os
+import uuid
+
+
+def write_file_atomic(path, data):
+    """
+    Écrit `data` (bytes) dans un fichier temporaire en un seul write() non bufferisé,
+    le synchronise sur disque puis le substitue à `path` avec os.replace.
+    Le nom temporaire est unique : deux écritures simultanées ne partagent pas de fichier
+    """
+    tmp_file = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_file, 'wb', buffering=0) as f:
+            f.write(data)
+            os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+    except BaseException:
+        # Ne pas laisser de fichier temporaire orphelin à côté de la cible
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+        raise